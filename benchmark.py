@@ -0,0 +1,228 @@
+"""
+This script runs the scraper pipeline (scraping, merging and analytics) against the local stand-in of data providers
+(see mock_providers.py) in a temporary working directory and reports latency and throughput of every stage
+and latency of provider requests.
+"""
+from pathlib import Path
+import importlib
+import os
+import shutil
+import tempfile
+import time
+
+import click
+
+from mock_providers import ProviderConfig, provider_options, start_server
+from mock_providers import tomtom_historical_payload
+
+AUXILIARY_DIR = Path(__file__).resolve().parent / "auxiliary_data"
+MB = 1024 * 1024
+
+
+def percentile(values, share):
+    """Get percentile of values (nearest rank)
+
+    Args:
+        values (list): values
+        share (float): share of values which are not greater than the percentile (e.g. 0.95)
+
+    Returns:
+        float: percentile (None if there are no values)
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(share * len(values)) - 1))]
+
+
+def timed_stage(stage, spans):
+    """Wrap the stage function, so its start and end times are recorded
+
+    Args:
+        stage (Stage): stage of the pipeline
+        spans (dict): start and end times (time.perf_counter()) by stage names
+
+    Returns:
+        Stage: stage with the wrapped function
+    """
+
+    def function(upstream):
+        start = time.perf_counter()
+        try:
+            return stage.function(upstream)
+        finally:
+            spans[stage.name] = (start, time.perf_counter())
+
+    return stage._replace(function=function)
+
+
+def stage_report(stages, statuses, spans, requests):
+    """Create a report of stage latency and throughput
+
+    Requests are attributed to the stage by the provider (the first part of the stage name)
+    and the time of the request.
+
+    Args:
+        stages (list): stages of the pipeline
+        statuses (dict): statuses of stages by names
+        spans (dict): start and end times of stages by names
+        requests (list): served requests (ProviderRequest)
+
+    Returns:
+        str: report with a line per stage
+    """
+    lines = [
+        "{:<18} {:<11} {:>8} {:>9} {:>9} {:>9} {:>9}".format(
+            "stage", "status", "seconds", "requests", "MB in", "MB out", "MB/s"
+        )
+    ]
+    for stage in stages:
+        if stage.name not in statuses:
+            continue
+        status = statuses[stage.name]
+        provider = stage.name.split("_")[0]
+        start, end = spans.get(stage.name, (0.0, 0.0))
+        stage_requests = [
+            request
+            for request in requests
+            if request.provider == provider and start <= request.start <= end
+        ]
+        bytes_in = sum(request.bytes for request in stage_requests)
+        bytes_out = sum(
+            Path(path).stat().st_size for path in stage.outputs if Path(path).is_file()
+        )
+        duration = end - start
+        throughput = (bytes_in + bytes_out) / MB / duration if duration > 0 else 0.0
+        lines.append(
+            "{:<18} {:<11} {:>8.2f} {:>9} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+                stage.name,
+                status.status,
+                duration,
+                len(stage_requests),
+                bytes_in / MB,
+                bytes_out / MB if status.status != "skipped" else 0.0,
+                throughput,
+            )
+        )
+    return "\n".join(lines)
+
+
+def provider_report(requests):
+    """Create a report of provider requests (latency is measured by the server)
+
+    Args:
+        requests (list): served requests (ProviderRequest)
+
+    Returns:
+        str: report with a line per provider
+    """
+    lines = [
+        "{:<9} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+            "provider", "requests", "failures", "MB", "mean ms", "p95 ms", "max ms"
+        )
+    ]
+    providers = sorted({request.provider for request in requests})
+    for provider in providers:
+        provider_requests = [
+            request for request in requests if request.provider == provider
+        ]
+        latencies = [
+            (request.end - request.start) * 1000 for request in provider_requests
+        ]
+        lines.append(
+            "{:<9} {:>9} {:>9} {:>9.2f} {:>9.1f} {:>9.1f} {:>9.1f}".format(
+                provider,
+                len(provider_requests),
+                sum(request.status != 200 for request in provider_requests),
+                sum(request.bytes for request in provider_requests) / MB,
+                sum(latencies) / len(latencies),
+                percentile(latencies, 0.95),
+                max(latencies),
+            )
+        )
+    return "\n".join(lines)
+
+
+def prepare_working_directory(directory, config):
+    """Prepare the working directory of the scraper: auxiliary data and historical TomTom data
+
+    Args:
+        directory: working directory
+        config (ProviderConfig): configuration of provider payloads
+    """
+    directory = Path(directory)
+    shutil.copytree(AUXILIARY_DIR, directory / AUXILIARY_DIR.name)
+    # TomTom report is built from new data and historical data
+    tomtom_dir = directory / "tomtom_reports"
+    tomtom_dir.mkdir()
+    (tomtom_dir / "tomtom_trafic_index_historical.csv").write_bytes(
+        tomtom_historical_payload(config)
+    )
+
+
+@click.command(help="Benchmark the scraper against local stand-in data providers")
+@provider_options
+@click.option(
+    "--stage",
+    "targets",
+    multiple=True,
+    help="Target stage (e.g. merge). If not provided - all stages",
+)
+@click.option("--workers", default=4, show_default=True, help="Concurrent stages")
+@click.option("--partitioned", is_flag=True, help="Write partitioned reports")
+@click.option(
+    "--runs",
+    default=1,
+    show_default=True,
+    help="Number of consecutive runs in the same working directory",
+)
+@click.option(
+    "--new-days",
+    default=0,
+    show_default=True,
+    help="Days of data which providers add before every next run",
+)
+@click.option("--keep", is_flag=True, help="Keep the working directory")
+def benchmark(targets, workers, partitioned, runs, new_days, keep, **config):
+    config["fail_paths"] = tuple(config["fail_paths"])
+    config = ProviderConfig(**config)
+    server = start_server(config)
+    # provider URLs are defined when the scraper package is imported
+    os.environ["MOBILITY_MOCK_PROVIDERS_URL"] = server.url
+    working_directory = tempfile.mkdtemp(prefix="mobility_benchmark_")
+    prepare_working_directory(working_directory, config)
+    current_directory = os.getcwd()
+    os.chdir(working_directory)
+    try:
+        scraper = importlib.import_module("scraper")
+        for run in range(1, runs + 1):
+            if run > 1 and new_days:
+                config = config._replace(days=config.days + new_days)
+                server.configure(config)
+            stages = scraper.build_stages(partitioned)
+            spans = {}
+            stages = [timed_stage(stage, spans) for stage in stages]
+            server.take_requests()
+            start = time.perf_counter()
+            statuses = scraper.run_pipeline(
+                stages, list(targets) or None, max_workers=workers
+            )
+            duration = time.perf_counter() - start
+            requests = server.take_requests()
+            print()
+            print("Run {} of {}: {:.2f} s".format(run, runs, duration))
+            print(stage_report(stages, statuses, spans, requests))
+            print()
+            print(provider_report(requests))
+    finally:
+        os.chdir(current_directory)
+        server.shutdown()
+        server.server_close()
+        if keep:
+            print("Working directory:", working_directory)
+        else:
+            shutil.rmtree(working_directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark()
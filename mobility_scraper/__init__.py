@@ -1,10 +1,45 @@
+import importlib
+
 from .paths_and_URLs import *
 from .download_files import *
 from .utils import *
-from .mobility_processing import (
-    google_mobility,
-    apple_mobility,
-    waze_mobility,
-    tomtom_mobility,
-    merge_reports,
-)
\ No newline at end of file
+
+# modules and functions which depend on pandas/numpy are imported on first access
+_LAZY_MODULES = {
+    "google_mobility": ".mobility_processing.google_mobility",
+    "apple_mobility": ".mobility_processing.apple_mobility",
+    "waze_mobility": ".mobility_processing.waze_mobility",
+    "tomtom_mobility": ".mobility_processing.tomtom_mobility",
+    "merge_reports": ".mobility_processing.merge_reports",
+    "panel_builder": ".mobility_processing.panel_builder",
+    "analytics": ".mobility_processing.analytics",
+}
+_LAZY_ATTRIBUTES = {
+    "write_partitioned": ".storage",
+    "read_partitioned": ".storage",
+    "query_report": ".query",
+    "iter_query": ".query",
+    "write_query_csv": ".query",
+    "REPORT_SCHEMAS": ".report_schemas",
+}
+
+# "from mobility_scraper import *" still provides everything (lazy names are imported then)
+__all__ = [
+    name for name in globals() if not name.startswith("_") and name != "importlib"
+] + list(_LAZY_MODULES) + list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        value = importlib.import_module(_LAZY_MODULES[name], __name__)
+    elif name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES) | set(_LAZY_ATTRIBUTES))
@@ -1,6 +1,5 @@
 from pathlib import Path
 
-import requests
 import urllib.request
 
 
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+except ImportError:  # cache is disabled without pyarrow
+    pa = None
+
+
+def cache_available():
+    """Check if Arrow cache can be used (pyarrow is installed)
+
+    Returns:
+        bool: flag indicating whether or not pyarrow is available
+    """
+    return pa is not None
+
+
+def write_frame_cache(df, cache_path):
+    """Write DataFrame to the uncompressed Arrow IPC file, so it can be memory-mapped later.
+    Does nothing if pyarrow isn't installed.
+
+    Args:
+        df (DataFrame): dataframe which needs to be cached
+        cache_path: location of the cache file. If directory doesn't exist, it will be created
+
+    Returns:
+        bool: flag indicating whether or not the cache file has been written
+    """
+    if pa is None:
+        return False
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = cache_path.with_suffix(".tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp_path.replace(cache_path)
+    return True
+
+
+def read_frame_cache(cache_path, source_path=None):
+    """Read DataFrame from the memory-mapped Arrow IPC file. Data isn't parsed as with CSV, but conversion
+    to pandas copies columns (strings become Python objects)
+
+    Args:
+        cache_path: location of the cache file
+        source_path (optional): location of the file which is mirrored by the cache (e.g. CSV report).
+                                If it's newer than the cache, the cache is considered stale
+
+    Returns:
+        DataFrame: cached dataframe (None if pyarrow isn't installed or cache is missing or stale)
+    """
+    cache_path = Path(cache_path)
+    if pa is None or not cache_path.is_file():
+        return None
+    if source_path is not None and Path(source_path).is_file():
+        if Path(source_path).stat().st_mtime_ns > cache_path.stat().st_mtime_ns:
+            return None
+    with pa.memory_map(str(cache_path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas()
@@ -0,0 +1,270 @@
+import numpy as np
+import pandas as pd
+
+from mobility_scraper.sorting import merge_sorted_runs, sort_by_keys
+
+ANALYTICS_DECIMALS = 6
+
+
+def _window_sums(codes, days, values, first_offset, last_offset):
+    """Sum values over a window of days inside each group of the sorted layout
+
+    Args:
+        codes (ndarray): group codes (rows of each group are contiguous, sorted by day inside a group)
+        days (ndarray): day numbers
+        values (ndarray): values (NaN if value is missing)
+        first_offset (int): first day of the window relative to the current day (e.g. -6)
+        last_offset (int): last day of the window relative to the current day (e.g. 0)
+
+    Returns:
+        tuple: sums and counts of available values in windows
+    """
+    # a single sorted key, where windows of different groups can't overlap
+    stride = int(days.max() - days.min()) + abs(first_offset) + abs(last_offset) + 1
+    key = codes.astype(np.int64) * stride + (days - days.min())
+    start = np.searchsorted(key, key + first_offset, side="left")
+    end = np.searchsorted(key, key + last_offset, side="right")
+    available = ~np.isnan(values)
+    cumulative_sums = np.concatenate(
+        ([0.0], np.cumsum(np.where(available, values, 0)))
+    )
+    cumulative_counts = np.concatenate(([0], np.cumsum(available)))
+    sums = cumulative_sums[end] - cumulative_sums[start]
+    counts = cumulative_counts[end] - cumulative_counts[start]
+    return sums, counts
+
+
+def _window_means(codes, days, values, first_offset, last_offset, min_periods):
+    """Average values over a window of days inside each group of the sorted layout
+
+    Args:
+        codes (ndarray): group codes
+        days (ndarray): day numbers
+        values (ndarray): values (NaN if value is missing)
+        first_offset (int): first day of the window relative to the current day
+        last_offset (int): last day of the window relative to the current day
+        min_periods (int): minimum number of available values in the window
+
+    Returns:
+        ndarray: means (NaN if there are not enough values)
+    """
+    sums, counts = _window_sums(codes, days, values, first_offset, last_offset)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts >= max(min_periods, 1), sums / counts, np.nan)
+
+
+def _lagged(codes, days, values, lag):
+    """Get values of the same group lag days earlier
+
+    Args:
+        codes (ndarray): group codes
+        days (ndarray): day numbers
+        values (ndarray): values
+        lag (int): number of days
+
+    Returns:
+        ndarray: lagged values (NaN if there is no row for that day)
+    """
+    stride = int(days.max() - days.min()) + lag + 1
+    key = codes.astype(np.int64) * stride + (days - days.min())
+    position = np.searchsorted(key, key - lag, side="left")
+    position = np.minimum(position, len(key) - 1)
+    found = key[position] == key - lag
+    return np.where(found, values[position], np.nan)
+
+
+def compute_analytics(
+    report, keys, metrics, windows=(7,), baseline_weeks=5, min_periods=1
+):
+    """Compute rolling means, weekday-adjusted baselines and change metrics for every metric column
+
+    For each metric the following columns are added:
+        "<metric>_<window>d_avg" - mean over the last <window> days (for every window)
+        "<metric>_wow" - change of the first rolling mean compared to 7 days earlier
+        "<metric>_weekday_baseline" - mean of the same weekday over the previous <baseline_weeks> weeks
+        "<metric>_vs_baseline" - difference between the value and the weekday baseline
+
+    Windows are defined by dates, so gaps in data are handled correctly.
+    Sums are computed from cumulative sums, so results are rounded to ANALYTICS_DECIMALS decimal places.
+
+    Args:
+        report (DataFrame): report with key columns and metric columns
+        keys (iterable): key columns (the date column is the last one)
+        metrics (iterable): metric columns
+        windows (iterable): lengths of rolling windows in days
+        baseline_weeks (int): number of weeks in the weekday baseline
+        min_periods (int): minimum number of available values in a rolling window
+
+    Returns:
+        DataFrame: report sorted by keys with analytics columns
+    """
+    keys = list(keys)
+    entity_keys, date_key = keys[:-1], keys[-1]
+    report = sort_by_keys(report, entity_keys + [date_key])
+    if len(report) == 0:
+        return report
+    # group codes of the sorted layout (rows of each entity are contiguous)
+    new_entity = np.zeros(len(report), dtype=bool)
+    new_entity[0] = True
+    for key in entity_keys:
+        column = report[key].to_numpy()
+        new_entity[1:] |= column[1:] != column[:-1]
+    codes = np.cumsum(new_entity) - 1
+    days = pd.to_datetime(report[date_key]).to_numpy().astype("datetime64[D]")
+    days = days.astype(np.int64)
+    # weekday layout: rows of each (entity, weekday) pair are contiguous
+    weekday_codes = codes * 7 + (days + 3) % 7
+    weekday_order = np.lexsort((days, weekday_codes))
+    weekday_codes, weekday_days = weekday_codes[weekday_order], days[weekday_order]
+
+    columns = {}
+    for metric in metrics:
+        values = report[metric].to_numpy(dtype=np.float64)
+        for window in windows:
+            columns[metric + "_{}d_avg".format(window)] = _window_means(
+                codes, days, values, -(window - 1), 0, min_periods
+            )
+        first_average = columns[metric + "_{}d_avg".format(windows[0])]
+        columns[metric + "_wow"] = first_average - _lagged(
+            codes, days, first_average, 7
+        )
+        baseline = np.empty(len(report))
+        baseline[weekday_order] = _window_means(
+            weekday_codes,
+            weekday_days,
+            values[weekday_order],
+            -7 * baseline_weeks,
+            -1,
+            1,
+        )
+        columns[metric + "_weekday_baseline"] = baseline
+        columns[metric + "_vs_baseline"] = values - baseline
+    columns = pd.DataFrame(columns, index=report.index).round(ANALYTICS_DECIMALS)
+    return pd.concat([report, columns], axis=1)
+
+
+def lookback_days(windows=(7,), baseline_weeks=5):
+    """Get number of days of history which affect analytics of a single day
+
+    Args:
+        windows (iterable): lengths of rolling windows in days
+        baseline_weeks (int): number of weeks in the weekday baseline
+
+    Returns:
+        int: number of days
+    """
+    return max(max(windows) - 1 + 7, 7 * baseline_weeks)
+
+
+def analytics_settings(windows=(7,), baseline_weeks=5, min_periods=1):
+    """Get settings which analytics depend on (the order of windows matters: changes use the first window).
+    Analytics computed with other settings can't be reused by incremental updates
+
+    Args:
+        windows (iterable): lengths of rolling windows in days
+        baseline_weeks (int): number of weeks in the weekday baseline
+        min_periods (int): minimum number of available values in a rolling window
+
+    Returns:
+        dict: settings (JSON serializable)
+    """
+    return {
+        "windows": [int(window) for window in windows],
+        "baseline_weeks": int(baseline_weeks),
+        "min_periods": int(min_periods),
+    }
+
+
+def revision_start(previous_partitions, partitions):
+    """Get the first date of revised history: the first day of the earliest monthly partition
+    which was changed, added or removed since analytics were computed
+
+    Args:
+        previous_partitions (dict): partition hashes of the report used by previous analytics
+                                    (see storage.partition_hashes)
+        partitions (dict): partition hashes of the current report
+
+    Returns:
+        str: the first date which needs to be recomputed (None if no partition has changed)
+    """
+    changed = [
+        name
+        for name in set(previous_partitions) | set(partitions)
+        if previous_partitions.get(name) != partitions.get(name)
+    ]
+    return min(changed) + "-01" if changed else None
+
+
+def update_analytics(
+    report,
+    previous,
+    keys,
+    metrics,
+    windows=(7,),
+    baseline_weeks=5,
+    min_periods=1,
+    since=None,
+):
+    """Update analytics incrementally: only rows from the first new (or revised) date are recomputed
+    (using the required history from the report), analytics of older rows are taken from previous analytics.
+    Key and metric columns always come from the report.
+
+    Args:
+        report (DataFrame): report with key columns and metric columns
+        previous (DataFrame): previously computed analytics (None if there are no analytics yet)
+        keys (iterable): key columns (the date column is the last one)
+        metrics (iterable): metric columns
+        windows (iterable): lengths of rolling windows in days
+        baseline_weeks (int): number of weeks in the weekday baseline
+        min_periods (int): minimum number of available values in a rolling window
+        since (str, optional): first date which needs to be recomputed (e.g. if historical data was revised,
+                               see revision_start). Dates after the last date in previous analytics
+                               are always recomputed
+
+    Returns:
+        DataFrame: analytics for the whole report sorted by keys (dates are in datetime64 format)
+    """
+    keys = list(keys)
+    date_key = keys[-1]
+    report = report.assign(**{date_key: pd.to_datetime(report[date_key])})
+    if previous is None or len(previous) == 0:
+        return compute_analytics(
+            report, keys, metrics, windows, baseline_weeks, min_periods
+        )
+    previous = previous.assign(**{date_key: pd.to_datetime(previous[date_key])})
+    first_new_date = previous[date_key].max() + pd.Timedelta(days=1)
+    if since is None:
+        since = first_new_date
+    since = min(pd.Timestamp(since), first_new_date)
+    history_start = since - pd.Timedelta(days=lookback_days(windows, baseline_weeks))
+    tail = compute_analytics(
+        report[report[date_key] >= history_start],
+        keys,
+        metrics,
+        windows,
+        baseline_weeks,
+        min_periods,
+    )
+    if set(tail.columns) != set(previous.columns):
+        # analytics settings have changed
+        return compute_analytics(
+            report, keys, metrics, windows, baseline_weeks, min_periods
+        )
+    tail = tail[tail[date_key] >= since]
+    # report columns of old rows come from the report, analytics columns - from previous analytics
+    analytics_columns = [column for column in tail.columns if column not in report]
+    head = report[report[date_key] < since]
+    head = head.merge(
+        previous.loc[previous[date_key] < since, keys + analytics_columns],
+        on=keys,
+        how="left",
+        indicator=True,
+    )
+    if (head.pop("_merge") != "both").any():
+        # rows of old dates were added without changes of partitions
+        return compute_analytics(
+            report, keys, metrics, windows, baseline_weeks, min_periods
+        )
+    head = sort_by_keys(head.loc[:, tail.columns], keys)
+    # both parts are sorted by keys
+    return merge_sorted_runs([head, tail], keys)
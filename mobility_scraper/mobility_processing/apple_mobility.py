@@ -1,25 +1,7 @@
-import json
-import urllib.request
-
 import pandas as pd
 
-
-def get_link():
-    """Get link of Apple Mobility Trends report file
-
-    Returns:
-        link (str): link of Apple Mobility Trends report file
-    """
-    # get link via API
-    json_link = "https://covid19-static.cdn-apple.com/covid19-mobility-data/current/v3/index.json"
-    with urllib.request.urlopen(json_link) as url:
-        json_data = json.loads(url.read().decode())
-    link = (
-        "https://covid19-static.cdn-apple.com"
-        + json_data["basePath"]
-        + json_data["regions"]["en-us"]["csvPath"]
-    )
-    return link
+from mobility_scraper.sorting import sort_by_keys
+from mobility_scraper.update_checks import get_apple_link as get_link
 
 
 def build_report(
@@ -71,8 +53,9 @@ def build_report(
         )
         apple["value"] = apple["value"] - 100
 
+        # pivot_table emits rows in index order, so the report comes out already sorted
         apple = apple.pivot_table(
-            index=["geo_type", "subregion_and_city", "sub-region", "date", "country"],
+            index=["country", "sub-region", "subregion_and_city", "date", "geo_type"],
             columns="transportation_type",
         ).reset_index()
         apple.columns = [t + (v if v != "value" else "") for v, t in apple.columns]
@@ -89,9 +72,9 @@ def build_report(
                 "walking",
             ],
         ]
-        apple = apple.sort_values(
-            by=["country", "sub-region", "subregion_and_city", "date"]
-        ).reset_index(drop=True)
+        apple = sort_by_keys(
+            apple, ["country", "sub-region", "subregion_and_city", "date"]
+        )
     elif report_type == "US":
         apple = apple[apple.country == "United States"].drop(columns=["country"])
         apple["sub-region"] = (
@@ -116,7 +99,7 @@ def build_report(
         apple["value"] = apple["value"] - 100
 
         apple = apple.pivot_table(
-            index=["geo_type", "state", "county_and_city", "date"],
+            index=["state", "county_and_city", "geo_type", "date"],
             columns="transportation_type",
         ).reset_index()
         apple.columns = [t + (v if v != "value" else "") for v, t in apple.columns]
@@ -133,7 +116,5 @@ def build_report(
                 "walking",
             ],
         ]
-        apple = apple.sort_values(
-            by=["state", "county_and_city", "geo_type", "date"]
-        ).reset_index(drop=True)
+        apple = sort_by_keys(apple, ["state", "county_and_city", "geo_type", "date"])
     return apple
\ No newline at end of file
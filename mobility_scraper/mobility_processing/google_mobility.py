@@ -54,7 +54,7 @@ def build_report(source,
                 "residential",
             ],
         ]
-        google["region"].fillna("Total", inplace=True)
+        google["region"] = google["region"].fillna("Total")
     elif report_type == "US":
         google = google[(google["country"] == "United States")]
         google = google.rename(
@@ -74,8 +74,8 @@ def build_report(source,
                 "residential",
             ],
         ]
-        google["state"].fillna("Total", inplace=True)
-        google["county"].fillna("Total", inplace=True)
+        google["state"] = google["state"].fillna("Total")
+        google["county"] = google["county"].fillna("Total")
     elif report_type == "regions_detailed" or report_type == "world_regions_detailed":
         if countries is not None and report_type == "regions_detailed":
             google = google[google.country.isin(countries)]
@@ -108,6 +108,6 @@ def build_report(source,
             "residential",
         ]
         google = google.loc[:, column_list]
-        google["sub region 1"].fillna("Total", inplace=True)
-        google["sub region 2"].fillna("Total", inplace=True)
+        google["sub region 1"] = google["sub region 1"].fillna("Total")
+        google["sub region 2"] = google["sub region 2"].fillna("Total")
     return google
\ No newline at end of file
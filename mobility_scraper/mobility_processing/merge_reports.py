@@ -2,6 +2,43 @@ from pathlib import Path
 import pandas as pd
 
 
+def read_report(source):
+    """Read generated report
+
+    Args:
+        source: location of the report in CSV or DataFrame (returned as is)
+
+    Returns:
+        DataFrame: report
+    """
+    if isinstance(source, pd.DataFrame):
+        return source
+    return pd.read_csv(source, low_memory=False)
+
+
+def convert_apple_names(apple, country_AtoG_file, subregions_AtoG_file):
+    """Convert Apple country and region names to Google names
+
+    Args:
+        apple (DataFrame): Apple report with "country" and "region" columns
+        country_AtoG_file: location of Apple and Google country names matching table in CSV
+        subregions_AtoG_file: location of Apple and Google subregions names matching table in CSV
+
+    Returns:
+        DataFrame: Apple report with converted names
+    """
+    apple = apple.copy()
+    if Path(country_AtoG_file).is_file():
+        country_AtoG = pd.read_csv(country_AtoG_file, index_col=0)
+        country_names = country_AtoG["country_google"]
+        apple["country"] = apple["country"].map(country_names).fillna(apple["country"])
+    if Path(subregions_AtoG_file).is_file():
+        subregions_AtoG = pd.read_csv(subregions_AtoG_file, index_col=0)
+        region_names = subregions_AtoG["subregion_Google"]
+        apple["region"] = apple["region"].map(region_names).fillna(apple["region"])
+    return apple
+
+
 def build_summary_report(
     apple_source,
     google_source,
@@ -12,8 +49,8 @@ def build_summary_report(
     """Build a merged report from Google and Apple data
 
     Args:
-        apple_source: location of the generated Apple report in CSV
-        google_source: location of the generated Google report in CSV
+        apple_source: location of the generated Apple report in CSV or DataFrame
+        google_source: location of the generated Google report in CSV or DataFrame
         country_AtoG_file: location of Apple and Google country names matching table in CSV
         subregions_AtoG_file: location of Apple and Google subregions names matching table in CSV
         report_type: two options available: "regions" - report for the worldwide, "US" - report for the US
@@ -21,8 +58,8 @@ def build_summary_report(
     Returns:
         summary (DataFrame): merged report from Google and Apple data
     """
-    apple = pd.read_csv(apple_source, low_memory=False)
-    google = pd.read_csv(google_source, low_memory=False)
+    apple = read_report(apple_source)
+    google = read_report(google_source)
     summary = pd.DataFrame()
     # build report for regions
     if report_type == "regions":
@@ -31,27 +68,7 @@ def build_summary_report(
             :, ["country", "region", "date", "driving", "transit", "walking"]
         ]
         # convert Apple country and sub-region names as in Google
-        if Path(country_AtoG_file).is_file():
-            country_AtoG = pd.read_csv(country_AtoG_file, index_col=0)
-        else:
-            country_AtoG = None
-        if Path(subregions_AtoG_file).is_file():
-            subregions_AtoG = pd.read_csv(subregions_AtoG_file, index_col=0)
-        else:
-            subregions_AtoG = None
-        # convert Apple countries and subregions to Google names
-        apple["country"] = apple.apply(
-            lambda x: country_AtoG.loc[x["country"], "country_google"]
-            if (country_AtoG is not None and x["country"] in country_AtoG.index)
-            else x["country"],
-            axis=1,
-        )
-        apple["region"] = apple.apply(
-            lambda x: subregions_AtoG.loc[x["region"], "subregion_Google"]
-            if (subregions_AtoG is not None and x["region"] in subregions_AtoG.index)
-            else x["region"],
-            axis=1,
-        )
+        apple = convert_apple_names(apple, country_AtoG_file, subregions_AtoG_file)
         # merge reports
         apple = apple.set_index(["country", "region", "date"])
         google = google.set_index(["country", "region", "date"])
@@ -0,0 +1,319 @@
+import numpy as np
+import pandas as pd
+
+from mobility_scraper.mobility_processing.merge_reports import (
+    convert_apple_names,
+    read_report,
+)
+from mobility_scraper.report_schemas import (
+    GOOGLE_METRICS,
+    APPLE_METRICS,
+    WAZE_METRICS,
+    TOMTOM_METRICS,
+)
+
+# columns which identify a geography of the panel
+GEOGRAPHY_KEYS = ["country", "region", "geo_type"]
+# geo types of Apple report in the panel (the same names as Waze geo types)
+APPLE_GEO_TYPES = {"country/region": "country", "sub-region": "sub-region", "city": "city"}
+
+
+class MobilityPanel:
+    """Mobility metrics of all sources aligned on a shared (geography id, day index) grid
+
+    Attributes:
+        geographies (DataFrame): country, region and geo type ("country", "sub-region" or "city")
+                                 of each geography (row number is a geography id)
+        start_date (Timestamp): date of the day index 0
+        metrics (tuple): metric names
+        values (ndarray): metric values with shape (geographies, days, metrics), NaN if value is missing
+        mask (ndarray): boolean array with the same shape as values, True if value is available
+    """
+
+    def __init__(self, geographies, start_date, metrics, values, mask=None):
+        self.geographies = geographies.reset_index(drop=True)
+        self.start_date = pd.Timestamp(start_date)
+        self.metrics = tuple(metrics)
+        self.values = values
+        self.mask = ~np.isnan(values) if mask is None else mask
+
+    @property
+    def dates(self):
+        """DatetimeIndex: dates of all day indices"""
+        return pd.date_range(self.start_date, periods=self.values.shape[1], freq="D")
+
+    def day_index(self, date):
+        """Get day index of the date
+
+        Args:
+            date: date (str, date or Timestamp)
+
+        Returns:
+            int: day index (may be out of the panel bounds)
+        """
+        return (pd.Timestamp(date) - self.start_date).days
+
+    def geography_ids(self, countries=None, regions=None, geo_types=None):
+        """Get ids of geographies which match country and region names and geo types
+
+        Args:
+            countries (iterable, optional): country names. If None - all countries
+            regions (iterable, optional): region names. If None - all regions
+            geo_types (iterable, optional): geo types. If None - all geo types
+
+        Returns:
+            ndarray: geography ids
+        """
+        selected = np.ones(len(self.geographies), dtype=bool)
+        if countries is not None:
+            selected &= self.geographies["country"].isin(countries).to_numpy()
+        if regions is not None:
+            selected &= self.geographies["region"].isin(regions).to_numpy()
+        if geo_types is not None:
+            selected &= self.geographies["geo_type"].isin(geo_types).to_numpy()
+        return np.flatnonzero(selected)
+
+    def slice(
+        self,
+        countries=None,
+        regions=None,
+        start_date=None,
+        end_date=None,
+        metrics=None,
+        geo_types=None,
+    ):
+        """Select a part of the panel. Date window is selected without copying data.
+
+        Args:
+            countries (iterable, optional): country names. If None - all countries
+            regions (iterable, optional): region names. If None - all regions
+            start_date (optional): first date (inclusive). If None - from the beginning of the panel
+            end_date (optional): last date (inclusive). If None - up to the end of the panel
+            metrics (iterable, optional): metric names. If None - all metrics
+            geo_types (iterable, optional): geo types. If None - all geo types
+
+        Returns:
+            MobilityPanel: selected part of the panel
+        """
+        n_days = self.values.shape[1]
+        first_day = 0 if start_date is None else max(self.day_index(start_date), 0)
+        last_day = (
+            n_days if end_date is None else min(self.day_index(end_date) + 1, n_days)
+        )
+        last_day = max(first_day, last_day)
+        values = self.values[:, first_day:last_day]
+        mask = self.mask[:, first_day:last_day]
+        geographies = self.geographies
+        if countries is not None or regions is not None or geo_types is not None:
+            ids = self.geography_ids(countries, regions, geo_types)
+            values, mask = values[ids], mask[ids]
+            geographies = geographies.iloc[ids]
+        if metrics is not None:
+            metric_ids = [self.metrics.index(metric) for metric in metrics]
+            values, mask = values[:, :, metric_ids], mask[:, :, metric_ids]
+        else:
+            metrics = self.metrics
+        start_date = self.start_date + pd.Timedelta(days=first_day)
+        return MobilityPanel(geographies, start_date, metrics, values, mask)
+
+    def to_frame(self, drop_missing=True):
+        """Convert panel to the report format (country, region, geo_type, date and metric columns)
+
+        Args:
+            drop_missing (bool): drop rows where all metrics are missing
+
+        Returns:
+            DataFrame: report
+        """
+        n_geographies, n_days, n_metrics = self.values.shape
+        geography_ids = np.repeat(np.arange(n_geographies), n_days)
+        day_ids = np.tile(np.arange(n_days), n_geographies)
+        values = self.values.reshape(-1, n_metrics)
+        if drop_missing:
+            rows = self.mask.reshape(-1, n_metrics).any(axis=1)
+            geography_ids, day_ids, values = (
+                geography_ids[rows],
+                day_ids[rows],
+                values[rows],
+            )
+        report = pd.DataFrame(
+            {
+                "country": self.geographies["country"].to_numpy()[geography_ids],
+                "region": self.geographies["region"].to_numpy()[geography_ids],
+                "geo_type": self.geographies["geo_type"].to_numpy()[geography_ids],
+                "date": self.dates.strftime("%Y-%m-%d").to_numpy()[day_ids],
+            }
+        )
+        report = pd.concat(
+            [report, pd.DataFrame(values, columns=list(self.metrics))], axis=1
+        )
+        return report
+
+    def save(self, path):
+        """Save panel to the NumPy .npz file
+
+        Args:
+            path: destination file path
+        """
+        np.savez(
+            path,
+            # names are converted one by one (to_numpy(dtype=str) may truncate them to a single character)
+            countries=np.array(self.geographies["country"].tolist(), dtype=str),
+            regions=np.array(self.geographies["region"].tolist(), dtype=str),
+            geo_types=np.array(self.geographies["geo_type"].tolist(), dtype=str),
+            start_date=np.array(self.start_date.strftime("%Y-%m-%d")),
+            metrics=np.array(self.metrics),
+            values=self.values,
+            mask=self.mask,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load panel from the NumPy .npz file
+
+        Args:
+            path: location of the .npz file
+
+        Returns:
+            MobilityPanel: loaded panel
+        """
+        with np.load(path) as data:
+            geographies = pd.DataFrame(
+                {
+                    "country": data["countries"],
+                    "region": data["regions"],
+                    "geo_type": data["geo_types"],
+                }
+            )
+            return cls(
+                geographies,
+                str(data["start_date"]),
+                data["metrics"].tolist(),
+                data["values"],
+                data["mask"],
+            )
+
+
+def build_panel(reports, dtype=np.float64):
+    """Align reports on a shared (geography id, day index) grid
+
+    Args:
+        reports (iterable): reports with "country", "region", "geo_type", "date" and metric columns
+        dtype: dtype of the metric values
+
+    Returns:
+        MobilityPanel: panel of all reports
+
+    Raises:
+        ValueError: geography keys are missing or several rows have a value of the same geography,
+                    date and metric
+    """
+    reports = [report for report in reports if len(report) > 0]
+    metrics = [
+        metric
+        for report in reports
+        for metric in report.columns
+        if metric not in (*GEOGRAPHY_KEYS, "date")
+    ]
+    metrics = list(dict.fromkeys(metrics))
+    keys = pd.concat(
+        [report.loc[:, [*GEOGRAPHY_KEYS, "date"]] for report in reports],
+        ignore_index=True,
+    )
+    missing = keys.loc[:, GEOGRAPHY_KEYS].isna().any(axis=1)
+    if missing.any():
+        raise ValueError(
+            "Panel: {} rows with missing country, region or geo type (e.g. {})".format(
+                missing.sum(),
+                ", ".join(map(str, keys.loc[missing.idxmax()].tolist())),
+            )
+        )
+    geography_ids, geographies = pd.MultiIndex.from_frame(
+        keys.loc[:, GEOGRAPHY_KEYS]
+    ).factorize(sort=True)
+    geographies = geographies.to_frame(index=False)
+    geographies.columns = GEOGRAPHY_KEYS
+    days = pd.to_datetime(keys["date"]).to_numpy().astype("datetime64[D]")
+    start_date = days.min()
+    day_ids = (days - start_date).astype(np.int64)
+    n_days = int(day_ids.max()) + 1
+
+    values = np.full((len(geographies), n_days, len(metrics)), np.nan, dtype=dtype)
+    offset = 0
+    for report in reports:
+        rows = slice(offset, offset + len(report))
+        offset += len(report)
+        for metric in report.columns:
+            if metric in (*GEOGRAPHY_KEYS, "date"):
+                continue
+            column = report[metric].to_numpy(dtype=dtype)
+            available = ~np.isnan(column)
+            cells = (
+                geography_ids[rows][available],
+                day_ids[rows][available],
+                metrics.index(metric),
+            )
+            # values mustn't be overwritten by other rows of the same or another report
+            flat_cells = cells[0] * n_days + cells[1]
+            order = np.argsort(flat_cells, kind="stable")
+            repeated = np.zeros(len(flat_cells), dtype=bool)
+            repeated[order[1:]] = flat_cells[order[1:]] == flat_cells[order[:-1]]
+            duplicated = repeated | ~np.isnan(values[cells])
+            if duplicated.any():
+                row = int(np.argmax(duplicated))
+                geography = geographies.iloc[cells[0][row]]
+                raise ValueError(
+                    "Panel: several values of {} for {} on {}".format(
+                        metric,
+                        ", ".join(map(str, geography.tolist())),
+                        np.datetime64(start_date + cells[1][row], "D"),
+                    )
+                )
+            values[cells] = column[available]
+    return MobilityPanel(geographies, pd.Timestamp(start_date), metrics, values)
+
+
+def build_panel_from_reports(
+    google_source,
+    apple_source,
+    waze_source,
+    tomtom_source,
+    country_AtoG_file,
+    subregions_AtoG_file,
+    dtype=np.float64,
+):
+    """Build a panel from Google, Apple, Waze and TomTom reports.
+    Apple names are converted to Google names, country-level data of all sources has "Total" region.
+    Geographies are distinguished by geo types, so e.g. a city and a sub-region with the same name
+    don't overwrite each other.
+
+    Args:
+        google_source: location of the generated Google report (for the worldwide) in CSV or DataFrame
+        apple_source: location of the generated Apple report (for the worldwide) in CSV or DataFrame
+        waze_source: location of the generated Waze report in CSV or DataFrame
+        tomtom_source: location of the generated TomTom report in CSV or DataFrame
+        country_AtoG_file: location of Apple and Google country names matching table in CSV
+        subregions_AtoG_file: location of Apple and Google subregions names matching table in CSV
+        dtype: dtype of the metric values
+
+    Returns:
+        MobilityPanel: panel of all sources
+    """
+    google = read_report(google_source)
+    google = google.assign(
+        geo_type=np.where(google["region"] == "Total", "country", "sub-region")
+    )
+    google = google.loc[:, [*GEOGRAPHY_KEYS, "date", *GOOGLE_METRICS]]
+    apple = read_report(apple_source)
+    apple = apple.rename(columns={"subregion_and_city": "region"})
+    apple = apple.assign(
+        geo_type=apple["geo_type"].map(APPLE_GEO_TYPES).fillna(apple["geo_type"])
+    )
+    apple = apple.loc[:, [*GEOGRAPHY_KEYS, "date", *APPLE_METRICS]]
+    apple = convert_apple_names(apple, country_AtoG_file, subregions_AtoG_file)
+    waze = read_report(waze_source).rename(columns={"city": "region"})
+    waze = waze.loc[:, [*GEOGRAPHY_KEYS, "date", *WAZE_METRICS]]
+    tomtom = read_report(tomtom_source).rename(columns={"city": "region"})
+    tomtom = tomtom.assign(geo_type="city")
+    tomtom = tomtom.loc[:, [*GEOGRAPHY_KEYS, "date", *TOMTOM_METRICS]]
+    return build_panel([google, apple, waze, tomtom], dtype=dtype)
@@ -5,37 +5,11 @@ import requests
 
 import pandas as pd
 
+from mobility_scraper.paths_and_URLs import TOMTOM_API_URL, TOMTOM_PAGE_DATA_URL
+from mobility_scraper.sorting import merge_sorted_runs, sort_by_keys
+from mobility_scraper.update_checks import check_tomtom_update as check_update
 
-def check_update(
-    tomtom_source,
-    api_key_check="JPN_tokyo",
-):
-    """Check if new TomTom data available
-
-    Args:
-        tomtom_source: location of the TomTom report in CSV format (if exist)
-        api_key_check: which city will be checked on the TomTom site
-    Returns:
-        new_files (bool): flag indicating whether or not new data available
-    """
-    new_files = False
-    # check if file available
-    if not tomtom_source.is_file():
-        new_files = True
-    else:
-        # get max date from the CSV report
-        tomtom = pd.read_csv(tomtom_source, low_memory=False)
-        last_report_date = tomtom["date"].max()
-        # get last available date from API
-        base_api_url = "https://api.midway.tomtom.com/ranking/dailyStats/"
-        api_url = base_api_url + api_key_check
-        response = requests.get(api_url)
-        json_data = response.json()
-        last_api_date = json_data[-1]["date"]
-        if last_api_date != last_report_date:
-            new_files = True
-
-    return new_files
+TOMTOM_KEYS = ["country", "city", "date"]
 
 
 def download_report(alpha_codes_filename):
@@ -48,10 +22,7 @@ def download_report(alpha_codes_filename):
         tomtom_data (DataFrame): scraped TomTom report
     """
     # get all available cities
-    json_link = (
-        "https://www.tomtom.com/en_gb/traffic-index/page-data/ranking/page-data.json"
-    )
-    with urllib.request.urlopen(json_link) as url:
+    with urllib.request.urlopen(TOMTOM_PAGE_DATA_URL) as url:
         json_data = json.loads(url.read().decode())
     # unpack data from json
     json_city_data = json_data["result"]["data"]["allCitiesJson"]["edges"]
@@ -80,11 +51,12 @@ def download_report(alpha_codes_filename):
     city_data.drop("country", axis=1, inplace=True)
     # create api key for scraping data
     city_data["api_key"] = city_data["Alpha3"] + "_" + city_data["key"]
+    # scrape cities in report order, so the concatenated data is already sorted
+    city_data = city_data.sort_values(by=["countryName", "name"], kind="mergesort")
     # scrape data for each city
-    base_api_url = "https://api.midway.tomtom.com/ranking/dailyStats/"
     city_df_list = []
     for _, row in city_data.iterrows():
-        api_url = base_api_url + row["api_key"]
+        api_url = TOMTOM_API_URL + row["api_key"]
         response = requests.get(api_url)
         json_data = response.json()
         if not json_data or not (isinstance(json_data, list)):
@@ -99,15 +71,16 @@ def download_report(alpha_codes_filename):
         :, ["country", "city", "date", "congestion", "diffRatio"]
     ]
     tomtom_data.drop_duplicates(inplace=True)
-    tomtom_data = tomtom_data.sort_values(by=["country", "city", "date"]).reset_index(
-        drop=True
-    )
+    tomtom_data = sort_by_keys(tomtom_data, TOMTOM_KEYS)
     return tomtom_data
 
 
 def merge_with_historical_data(tomtom_new, historical_path):
     """Merge new scraped data with historical
 
+    Both inputs are expected to be sorted by country, city and date (the historical file is stored sorted),
+    so they are merged as two sorted runs instead of re-sorting the whole history.
+
     Args:
         tomtom_new (DataFrame): new scraped data
         historical_path: location of the historical TomTom data in CSV format
@@ -116,9 +89,8 @@ def merge_with_historical_data(tomtom_new, historical_path):
         DataFrame: merged DataFrame
     """
     tomtom_historical = pd.read_csv(historical_path, low_memory=False)
-    tomtom_data = tomtom_historical.append(tomtom_new)
-    tomtom_data = tomtom_data.sort_values(by=["country", "city", "date"]).reset_index(
-        drop=True
-    )
+    tomtom_historical = sort_by_keys(tomtom_historical, TOMTOM_KEYS)
+    tomtom_new = sort_by_keys(tomtom_new, TOMTOM_KEYS)
+    tomtom_data = merge_sorted_runs([tomtom_historical, tomtom_new], TOMTOM_KEYS)
 
     return tomtom_data
\ No newline at end of file
@@ -1,36 +1,77 @@
 import pandas as pd
 
+from mobility_scraper.sorting import sort_by_keys
 
-def build_report(countries_source, cities_source):
+WAZE_KEYS = ["country", "city", "geo_type", "date"]
+WAZE_RAW_COLUMNS = {
+    "Country": "country",
+    "City": "city",
+    "Date": "date",
+    "% Change In Waze Driven Miles/KMs": "driving_waze",
+}
+
+
+def read_feed(source, geo_type):
+    """Read raw Waze feed and transform it to the report layout (dates are parsed to datetime64)
+
+    Args:
+        source: location of the raw Waze CSV report (or DataFrame with the raw report)
+        geo_type (str): geo type of the feed ("country" or "city")
+
+    Returns:
+        DataFrame: report layout of the feed
+    """
+    columns = [
+        column
+        for column in WAZE_RAW_COLUMNS
+        if column != "City" or geo_type == "city"
+    ]
+    if isinstance(source, pd.DataFrame):
+        feed = source.loc[:, columns]
+    else:
+        feed = pd.read_csv(source, usecols=columns)
+    feed = feed.rename(columns=WAZE_RAW_COLUMNS)
+    # the same dates are repeated for every region, so parsed dates are cached
+    feed["date"] = pd.to_datetime(feed["date"], cache=True)
+    if geo_type == "country":
+        feed["city"] = "Total"
+    feed["geo_type"] = geo_type
+    feed["driving_waze"] = feed["driving_waze"] * 100
+    return feed.loc[:, [*WAZE_KEYS, "driving_waze"]]
+
+
+def build_report(countries_source=None, cities_source=None, previous=None):
     """Build cleaned Waze report (transform dates from string to date format, merge country&city-level data,
     add geo_type column)
 
+    Feeds can be provided incrementally: rows of the provided feeds replace rows of the previous report
+    with the same keys, other rows of the previous report are kept.
+
     Args:
-        countries_source: location of the raw Waze country-level CSV report
-        cities_source: location of the raw Waze city-level CSV report
+        countries_source (optional): location of the raw Waze country-level CSV report
+        cities_source (optional): location of the raw Waze city-level CSV report
+        previous (optional): previously generated Waze report (location in CSV format or DataFrame)
 
     Returns:
-       waze (DataFrame): generated Waze report
+       waze (DataFrame): generated Waze report (dates are in datetime64 format)
     """
-    waze_countries = pd.read_csv(countries_source, parse_dates=["Date"])
-    waze_cities = pd.read_csv(cities_source, parse_dates=["Date"])
-    waze_countries["City"] = "Total"
-    waze_countries["geo_type"] = "country"
-    waze_cities["geo_type"] = "city"
-
-    waze = waze_countries.append(waze_cities)
-    waze = waze.rename(
-        columns={
-            "Country": "country",
-            "City": "city",
-            "Date": "date",
-            "% Change In Waze Driven Miles/KMs": "driving_waze",
-        }
-    )
-    waze["driving_waze"] = waze["driving_waze"] * 100
-    waze["date"] = waze["date"].dt.date
-    waze = waze.loc[:, ["country", "city", "geo_type", "date", "driving_waze"]]
-    waze = waze.sort_values(by=["country", "city", "geo_type", "date"]).reset_index(
-        drop=True
-    )
-    return waze
\ No newline at end of file
+    reports = []
+    if previous is not None:
+        if not isinstance(previous, pd.DataFrame):
+            previous = pd.read_csv(previous)
+        previous = previous.loc[:, [*WAZE_KEYS, "driving_waze"]]
+        previous["date"] = pd.to_datetime(previous["date"], cache=True)
+        reports.append(previous)
+    if countries_source is not None:
+        reports.append(read_feed(countries_source, "country"))
+    if cities_source is not None:
+        reports.append(read_feed(cities_source, "city"))
+    if not reports:
+        raise ValueError("Waze report: no sources are provided")
+
+    waze = pd.concat(reports, ignore_index=True)
+    # stable sort keeps rows of later feeds after rows of the previous report
+    waze = sort_by_keys(waze, WAZE_KEYS)
+    if previous is not None:
+        waze = waze.drop_duplicates(WAZE_KEYS, keep="last", ignore_index=True)
+    return waze
@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 
 # URLs
 GOOGLE_URL = "https://www.gstatic.com/covid19/mobility/Global_Mobility_Report.csv"
@@ -6,6 +7,35 @@ WAZE_URLS = (
     "https://raw.githubusercontent.com/ActiveConclusion/waze_mobility_scraper/master/Waze_Country-Level_Data.csv",
     "https://raw.githubusercontent.com/ActiveConclusion/waze_mobility_scraper/master/Waze_City-Level_Data.csv",
 )
+APPLE_BASE_URL = "https://covid19-static.cdn-apple.com"
+APPLE_INDEX_URL = APPLE_BASE_URL + "/covid19-mobility-data/current/v3/index.json"
+TOMTOM_PAGE_DATA_URL = (
+    "https://www.tomtom.com/en_gb/traffic-index/page-data/ranking/page-data.json"
+)
+TOMTOM_API_URL = "https://api.midway.tomtom.com/ranking/dailyStats/"
+# base URL of the local stand-in of all data providers (see mock_providers.py).
+# If it's set, data is requested from it instead of real providers
+MOCK_PROVIDERS_URL = os.environ.get("MOBILITY_MOCK_PROVIDERS_URL")
+if MOCK_PROVIDERS_URL:
+    GOOGLE_URL = MOCK_PROVIDERS_URL + "/google/Global_Mobility_Report.csv"
+    WAZE_URLS = (
+        MOCK_PROVIDERS_URL + "/waze/Waze_Country-Level_Data.csv",
+        MOCK_PROVIDERS_URL + "/waze/Waze_City-Level_Data.csv",
+    )
+    APPLE_BASE_URL = MOCK_PROVIDERS_URL + "/apple"
+    APPLE_INDEX_URL = APPLE_BASE_URL + "/covid19-mobility-data/current/v3/index.json"
+    TOMTOM_PAGE_DATA_URL = MOCK_PROVIDERS_URL + "/tomtom/page-data.json"
+    TOMTOM_API_URL = MOCK_PROVIDERS_URL + "/tomtom/dailyStats/"
+# TomTom cities (API keys) which are checked for updates
+TOMTOM_CHECK_CITY = "JPN_tokyo"
+TOMTOM_CHECK_SAMPLE = (
+    "JPN_tokyo",
+    "GBR_london",
+    "FRA_paris",
+    "DEU_berlin",
+    "BRA_sao-paulo",
+    "AUS_sydney",
+)
 # Directories
 GOOGLE_DIR = "google_reports"
 APPLE_DIR = "apple_reports"
@@ -18,6 +48,12 @@ APPLE_RAW_FILE = "applemobilitytrends.csv"
 WAZE_RAW_FILES = ("Waze_Country-Level_Data.csv", "Waze_City-Level_Data.csv")
 # extensions
 EXTENSIONS = (".csv", ".xlsx")
+# subdirectory of partitioned datasets (by year and month)
+PARTITIONS_DIR = "partitions"
+# manifest of the partitioned dataset (partition files and their statistics)
+MANIFEST_FILE = "manifest.json"
+# suffix of analytics reports (rolling means, baselines and changes)
+ANALYTICS_SUFFIX = "_analytics.csv"
 # Google paths
 GOOGLE_RAW_ZIP_FILE = "Global_Mobility_Report.zip"
 GOOGLE_ZIP_PATH = Path(GOOGLE_DIR, GOOGLE_RAW_ZIP_FILE)
@@ -51,6 +87,8 @@ GOOGLE_AMERICA_OCEANIA_PATHS = {
     ext: Path(GOOGLE_DIR, GOOGLE_AMERICA_OCEANIA_FILE).with_suffix(ext)
     for ext in EXTENSIONS
 }
+GOOGLE_REGIONS_PARTITIONS_PATH = Path(GOOGLE_DIR, PARTITIONS_DIR, GOOGLE_REGIONS_FILE)
+GOOGLE_REGIONS_ANALYTICS_PATH = Path(GOOGLE_DIR, GOOGLE_REGIONS_FILE + ANALYTICS_SUFFIX)
 # Apple paths
 APPLE_CSV_PATH = Path(APPLE_DIR, APPLE_RAW_FILE)
 APPLE_WORLD_FILE = "apple_mobility_report"
@@ -62,6 +100,8 @@ APPLE_WORLD_PATHS = {
 APPLE_US_PATHS = {
     ext: Path(APPLE_DIR, APPLE_US_FILE).with_suffix(ext) for ext in EXTENSIONS
 }
+APPLE_WORLD_PARTITIONS_PATH = Path(APPLE_DIR, PARTITIONS_DIR, APPLE_WORLD_FILE)
+APPLE_WORLD_ANALYTICS_PATH = Path(APPLE_DIR, APPLE_WORLD_FILE + ANALYTICS_SUFFIX)
 # Waze paths
 WAZE_COUNTRY_LEVEL_PATH = Path(WAZE_DIR, WAZE_RAW_FILES[0])
 WAZE_CITY_LEVEL_PATH = Path(WAZE_DIR, WAZE_RAW_FILES[1])
@@ -70,6 +110,8 @@ WAZE_REPORT_FILE = "waze_mobility"
 WAZE_REPORT_PATHS = {
     ext: Path(WAZE_DIR, WAZE_REPORT_FILE).with_suffix(ext) for ext in EXTENSIONS
 }
+WAZE_REPORT_PARTITIONS_PATH = Path(WAZE_DIR, PARTITIONS_DIR, WAZE_REPORT_FILE)
+WAZE_REPORT_ANALYTICS_PATH = Path(WAZE_DIR, WAZE_REPORT_FILE + ANALYTICS_SUFFIX)
 # TomTom paths
 TOMTOM_REPORT_FILE = "tomtom_trafic_index"
 TOMTOM_HISTORICAL_DATA_FILE = "tomtom_trafic_index_historical.csv"
@@ -77,6 +119,8 @@ TOMTOM_REPORT_PATHS = {
     ext: Path(TOMTOM_DIR, TOMTOM_REPORT_FILE).with_suffix(ext) for ext in EXTENSIONS
 }
 TOMTOM_HISTORICAL_DATA_PATH = Path(TOMTOM_DIR, TOMTOM_HISTORICAL_DATA_FILE)
+TOMTOM_REPORT_PARTITIONS_PATH = Path(TOMTOM_DIR, PARTITIONS_DIR, TOMTOM_REPORT_FILE)
+TOMTOM_REPORT_ANALYTICS_PATH = Path(TOMTOM_DIR, TOMTOM_REPORT_FILE + ANALYTICS_SUFFIX)
 # Merged reports
 SUMMARY_REGIONS_FILE = "summary_report_regions"
 SUMMARY_US_FILE = "summary_report_US"
@@ -92,6 +136,33 @@ SUMMARY_COUNTRIES_PATHS = {
     ext: Path(SUMMARY_DIR, SUMMARY_COUNTRIES_FILE).with_suffix(ext)
     for ext in EXTENSIONS
 }
+SUMMARY_COUNTRIES_PARTITIONS_PATH = Path(
+    SUMMARY_DIR, PARTITIONS_DIR, SUMMARY_COUNTRIES_FILE
+)
+SUMMARY_COUNTRIES_ANALYTICS_PATH = Path(
+    SUMMARY_DIR, SUMMARY_COUNTRIES_FILE + ANALYTICS_SUFFIX
+)
+# Panel of all sources
+SUMMARY_PANEL_FILE = "summary_panel.npz"
+SUMMARY_ALL_SOURCES_FILE = "summary_report_all_sources"
+
+SUMMARY_PANEL_PATH = Path(SUMMARY_DIR, SUMMARY_PANEL_FILE)
+SUMMARY_ALL_SOURCES_PATHS = {
+    ext: Path(SUMMARY_DIR, SUMMARY_ALL_SOURCES_FILE).with_suffix(ext)
+    for ext in EXTENSIONS
+}
+
+# Arrow cache of intermediate reports (between scraping and merging)
+CACHE_DIR = ".cache"
+CACHE_EXTENSION = ".arrow"
+GOOGLE_REGIONS_CACHE_PATH = Path(CACHE_DIR, GOOGLE_REGIONS_FILE + CACHE_EXTENSION)
+GOOGLE_US_CACHE_PATH = Path(CACHE_DIR, GOOGLE_US_FILE + CACHE_EXTENSION)
+APPLE_WORLD_CACHE_PATH = Path(CACHE_DIR, APPLE_WORLD_FILE + CACHE_EXTENSION)
+APPLE_US_CACHE_PATH = Path(CACHE_DIR, APPLE_US_FILE + CACHE_EXTENSION)
+
+# State of previous runs (last published dates etc.)
+RUN_STATE_FILE = "run_state.json"
+RUN_STATE_PATH = Path(RUN_STATE_FILE)
 
 # Auxiliary data paths
 AUXILIARY_DIR = "auxiliary_data"
@@ -0,0 +1,231 @@
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+import hashlib
+import time
+import traceback
+
+from .paths_and_URLs import RUN_STATE_PATH
+from .run_state import read_run_state, update_run_state
+
+# stage statuses
+SUCCESS = "success"  # stage ran and produced changes
+NO_CHANGES = "no changes"  # stage ran, but there is nothing new
+SKIPPED = "skipped"  # upstream stages and inputs haven't changed
+FAILED = "failed"  # stage raised an exception
+BLOCKED = "blocked"  # upstream stage failed or was blocked
+
+Stage = namedtuple("Stage", ["name", "function", "depends_on", "inputs", "outputs"])
+Stage.__new__.__defaults__ = ((), (), ())
+Stage.__doc__ = """Named stage of the pipeline
+
+    Args:
+        name (str): name of the stage
+        function: function which takes a dict with results of upstream stages (by names) and returns a result.
+                  A falsy result means that the stage didn't produce any changes
+        depends_on (tuple): names of upstream stages. Stages without upstream stages always run
+        inputs (tuple): files which are read by the stage
+        outputs (tuple): files which are written by the stage
+"""
+
+StageStatus = namedtuple(
+    "StageStatus", ["name", "status", "result", "error", "duration"]
+)
+StageStatus.__doc__ = """Status of the finished stage
+
+    Args:
+        name (str): name of the stage
+        status (str): one of SUCCESS, NO_CHANGES, SKIPPED, FAILED, BLOCKED
+        result: result of the stage function (None if it didn't run)
+        error (str): error message if the stage failed
+        duration (float): running time in seconds
+"""
+
+
+def file_fingerprint(path, chunk_size=1024 * 1024):
+    """Get fingerprint of the file content. Modification times aren't used, because a fresh checkout
+    of the repository resets them
+
+    Args:
+        path: location of the file
+        chunk_size (int): size of chunks which are read from the file
+
+    Returns:
+        str: sha256 hash of the file content (None if the file doesn't exist)
+    """
+    path = Path(path)
+    if not path.is_file():
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def select_stages(stages, targets=None):
+    """Select target stages with all their upstream stages
+
+    Args:
+        stages (iterable): all stages
+        targets (iterable, optional): names of target stages. If None - all stages
+
+    Returns:
+        dict: selected stages by names (in the original order)
+    """
+    stages = {stage.name: stage for stage in stages}
+    if targets is None:
+        return stages
+    selected = set()
+    queue = list(targets)
+    while queue:
+        name = queue.pop()
+        if name not in stages:
+            raise ValueError("Unknown stage: " + name)
+        if name not in selected:
+            selected.add(name)
+            queue.extend(stages[name].depends_on)
+    return {name: stage for name, stage in stages.items() if name in selected}
+
+
+def run_stage(stage, upstream_results):
+    """Run the stage and catch its exceptions
+
+    Args:
+        stage (Stage): stage which needs to be run
+        upstream_results (dict): results of upstream stages by names
+
+    Returns:
+        StageStatus: status of the stage
+    """
+    start = time.perf_counter()
+    try:
+        result = stage.function(upstream_results)
+    except Exception as e:
+        print(stage.name, ": Update failed.")
+        traceback.print_exc()
+        return StageStatus(
+            stage.name, FAILED, None, repr(e), time.perf_counter() - start
+        )
+    status = SUCCESS if result else NO_CHANGES
+    return StageStatus(stage.name, status, result, None, time.perf_counter() - start)
+
+
+def run_pipeline(stages, targets=None, max_workers=4, run_state_path=RUN_STATE_PATH):
+    """Run stages in dependency order. Independent stages run in parallel.
+
+    A stage is skipped if none of its upstream stages produced changes, its inputs haven't changed since
+    the last run, all its outputs exist and it didn't fail (and wasn't blocked) during the last run.
+    If a stage fails, only stages which depend on it are blocked.
+
+    Args:
+        stages (iterable): stages of the pipeline
+        targets (iterable, optional): names of target stages. If None - all stages
+        max_workers (int): maximum number of stages running at the same time
+        run_state_path: location of the run state file (with fingerprints of stage inputs and last statuses)
+
+    Returns:
+        dict: statuses of stages by names (in the original order)
+    """
+    pending = select_stages(stages, targets)
+    order = list(pending)
+    for stage in pending.values():
+        for dependency in stage.depends_on:
+            if dependency not in pending:
+                raise ValueError(
+                    "Unknown upstream stage {} of {}".format(dependency, stage.name)
+                )
+    run_state = read_run_state(run_state_path)
+    input_fingerprints = run_state.get("pipeline", {})
+    last_statuses = run_state.get("pipeline_status", {})
+    statuses = {}
+    fingerprints = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            progress = False
+            for name, stage in list(pending.items()):
+                if any(dependency not in statuses for dependency in stage.depends_on):
+                    continue
+                del pending[name]
+                progress = True
+                upstream = [statuses[dependency] for dependency in stage.depends_on]
+                fingerprints[name] = {
+                    str(path): file_fingerprint(path) for path in stage.inputs
+                }
+                if any(status.status in (FAILED, BLOCKED) for status in upstream):
+                    statuses[name] = StageStatus(name, BLOCKED, None, None, 0.0)
+                    continue
+                previous = input_fingerprints.get(name)
+                inputs_changed = previous is not None and previous != fingerprints[name]
+                outputs_exist = all(Path(path).is_file() for path in stage.outputs)
+                if (
+                    stage.depends_on
+                    and last_statuses.get(name) not in (FAILED, BLOCKED)
+                    and not any(status.status == SUCCESS for status in upstream)
+                    and not inputs_changed
+                    and outputs_exist
+                ):
+                    statuses[name] = StageStatus(name, SKIPPED, None, None, 0.0)
+                    continue
+                upstream_results = {status.name: status.result for status in upstream}
+                future = executor.submit(run_stage, stage, upstream_results)
+                running[future] = name
+            if progress and pending:
+                # statuses of some stages were set without running them
+                continue
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                statuses[name] = future.result()
+    for name in pending:
+        statuses[name] = StageStatus(name, BLOCKED, None, "dependency cycle", 0.0)
+    # remember statuses, so stages which failed or were blocked are retried by the next run
+    update_run_state(
+        "pipeline_status",
+        run_state_path,
+        **{name: status.status for name, status in statuses.items()}
+    )
+    # remember inputs of stages which didn't fail
+    update_run_state(
+        "pipeline",
+        run_state_path,
+        **{
+            name: fingerprints[name]
+            for name, status in statuses.items()
+            if status.status in (SUCCESS, NO_CHANGES, SKIPPED)
+        }
+    )
+    return {name: statuses[name] for name in order}
+
+
+def has_failures(statuses):
+    """Check if any stage failed or was blocked
+
+    Args:
+        statuses (dict): statuses of stages by names
+
+    Returns:
+        bool: flag indicating whether or not any stage failed or was blocked
+    """
+    return any(status.status in (FAILED, BLOCKED) for status in statuses.values())
+
+
+def status_report(statuses):
+    """Create a report of stage statuses
+
+    Args:
+        statuses (dict): statuses of stages by names
+
+    Returns:
+        str: report with a line per stage
+    """
+    lines = []
+    for status in statuses.values():
+        line = "{}: {} ({:.1f} s)".format(status.name, status.status, status.duration)
+        if status.error:
+            line += " - " + status.error
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,147 @@
+import pandas as pd
+
+from .report_schemas import REPORT_SCHEMAS
+from .storage import iter_partitions, partitions_are_current
+
+# number of rows read at once from monolithic CSV reports
+CHUNK_SIZE = 200000
+
+
+def select_columns(source, metrics=None):
+    """Get columns which need to be read from the report
+
+    Args:
+        source (str): name of the report (google, apple, waze, tomtom or summary)
+        metrics (iterable, optional): metric columns. If None - all metrics of the report
+
+    Returns:
+        list: key columns followed by selected metric columns
+    """
+    if source not in REPORT_SCHEMAS:
+        raise ValueError(
+            "Unknown source: {}. Available sources: {}".format(
+                source, ", ".join(REPORT_SCHEMAS)
+            )
+        )
+    schema = REPORT_SCHEMAS[source]
+    if metrics is None or len(metrics) == 0:
+        metrics = schema.metrics
+    unknown_metrics = [metric for metric in metrics if metric not in schema.metrics]
+    if unknown_metrics:
+        raise ValueError(
+            "Unknown metrics for {}: {}. Available metrics: {}".format(
+                source, ", ".join(unknown_metrics), ", ".join(schema.metrics)
+            )
+        )
+    return list(schema.keys) + list(metrics)
+
+
+def filter_rows(
+    df, source, countries=None, regions=None, start_date=None, end_date=None
+):
+    """Select rows of the report chunk which match filters
+
+    Args:
+        df (DataFrame): chunk of the report
+        source (str): name of the report
+        countries (iterable, optional): country names
+        regions (iterable, optional): names of subregions/cities
+        start_date (str, optional): first date (inclusive) in "YYYY-MM-DD" format
+        end_date (str, optional): last date (inclusive) in "YYYY-MM-DD" format
+
+    Returns:
+        DataFrame: filtered chunk
+    """
+    schema = REPORT_SCHEMAS[source]
+    mask = pd.Series(True, index=df.index)
+    if countries:
+        mask &= df["country"].isin(countries)
+    if regions:
+        mask &= df[schema.region_column].isin(regions)
+    if start_date is not None:
+        mask &= df["date"] >= str(start_date)
+    if end_date is not None:
+        mask &= df["date"] <= str(end_date)
+    return df[mask]
+
+
+def iter_query(
+    source,
+    countries=None,
+    regions=None,
+    start_date=None,
+    end_date=None,
+    metrics=None,
+    chunksize=CHUNK_SIZE,
+):
+    """Query the processed report chunk by chunk.
+    Only selected columns are parsed, rows are filtered while reading. If the partitioned dataset of the report
+    holds its current version (CSV report hasn't been rewritten since), partitions outside the date range
+    are skipped entirely.
+
+    Args:
+        source (str): name of the report (google, apple, waze, tomtom or summary)
+        countries (iterable, optional): country names. If None - all countries
+        regions (iterable, optional): names of subregions/cities. If None - all regions
+        start_date (str, optional): first date (inclusive) in "YYYY-MM-DD" format
+        end_date (str, optional): last date (inclusive) in "YYYY-MM-DD" format
+        metrics (iterable, optional): metric columns. If None - all metrics of the report
+        chunksize (int): number of rows read at once from the monolithic CSV report
+
+    Yields:
+        DataFrame: chunks of matching rows
+    """
+    columns = select_columns(source, metrics)
+    schema = REPORT_SCHEMAS[source]
+    if regions and schema.region_column is None:
+        raise ValueError("{} report has no regions".format(source))
+    if partitions_are_current(schema.partitions_path, schema.csv_path):
+        chunks = iter_partitions(schema.partitions_path, start_date, end_date, columns)
+    else:
+        chunks = pd.read_csv(
+            schema.csv_path, usecols=columns, chunksize=chunksize, low_memory=False
+        )
+    for chunk in chunks:
+        chunk = filter_rows(chunk, source, countries, regions, start_date, end_date)
+        if len(chunk) > 0:
+            yield chunk.loc[:, columns]
+
+
+def query_report(
+    source,
+    countries=None,
+    regions=None,
+    start_date=None,
+    end_date=None,
+    metrics=None,
+):
+    """Query the processed report
+
+    Args:
+        source (str): name of the report (google, apple, waze, tomtom or summary)
+        countries (iterable, optional): country names. If None - all countries
+        regions (iterable, optional): names of subregions/cities. If None - all regions
+        start_date (str, optional): first date (inclusive) in "YYYY-MM-DD" format
+        end_date (str, optional): last date (inclusive) in "YYYY-MM-DD" format
+        metrics (iterable, optional): metric columns. If None - all metrics of the report
+
+    Returns:
+        DataFrame: matching rows
+    """
+    chunks = list(iter_query(source, countries, regions, start_date, end_date, metrics))
+    if not chunks:
+        return pd.DataFrame(columns=select_columns(source, metrics))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_query_csv(chunks, buffer):
+    """Write query results to CSV chunk by chunk
+
+    Args:
+        chunks (iterable): chunks of query results
+        buffer: file object opened for writing
+    """
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(buffer, index=False, header=header)
+        header = False
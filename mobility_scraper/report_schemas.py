@@ -0,0 +1,80 @@
+from collections import namedtuple
+
+from .paths_and_URLs import *
+
+ReportSchema = namedtuple(
+    "ReportSchema",
+    [
+        "csv_path",
+        "partitions_path",
+        "analytics_path",
+        "keys",
+        "region_column",
+        "metrics",
+    ],
+)
+ReportSchema.__doc__ = """Description of a processed report
+
+    Args:
+        csv_path: location of the report in CSV format
+        partitions_path: location of the partitioned dataset of the report
+        analytics_path: location of the analytics report (rolling means, baselines and changes) in CSV format
+        keys (tuple): key columns which identify a row (the date column is the last one)
+        region_column (str): column with names of subregions/cities (None for country-level reports)
+        metrics (tuple): metric columns
+"""
+
+GOOGLE_METRICS = (
+    "retail and recreation",
+    "grocery and pharmacy",
+    "parks",
+    "transit stations",
+    "workplaces",
+    "residential",
+)
+APPLE_METRICS = ("driving", "transit", "walking")
+WAZE_METRICS = ("driving_waze",)
+TOMTOM_METRICS = ("congestion", "diffRatio")
+
+REPORT_SCHEMAS = {
+    "google": ReportSchema(
+        GOOGLE_REGIONS_PATHS[".csv"],
+        GOOGLE_REGIONS_PARTITIONS_PATH,
+        GOOGLE_REGIONS_ANALYTICS_PATH,
+        ("country", "region", "date"),
+        "region",
+        GOOGLE_METRICS,
+    ),
+    "apple": ReportSchema(
+        APPLE_WORLD_PATHS[".csv"],
+        APPLE_WORLD_PARTITIONS_PATH,
+        APPLE_WORLD_ANALYTICS_PATH,
+        ("country", "sub-region", "subregion_and_city", "geo_type", "date"),
+        "subregion_and_city",
+        APPLE_METRICS,
+    ),
+    "waze": ReportSchema(
+        WAZE_REPORT_PATHS[".csv"],
+        WAZE_REPORT_PARTITIONS_PATH,
+        WAZE_REPORT_ANALYTICS_PATH,
+        ("country", "city", "geo_type", "date"),
+        "city",
+        WAZE_METRICS,
+    ),
+    "tomtom": ReportSchema(
+        TOMTOM_REPORT_PATHS[".csv"],
+        TOMTOM_REPORT_PARTITIONS_PATH,
+        TOMTOM_REPORT_ANALYTICS_PATH,
+        ("country", "city", "date"),
+        "city",
+        TOMTOM_METRICS,
+    ),
+    "summary": ReportSchema(
+        SUMMARY_COUNTRIES_PATHS[".csv"],
+        SUMMARY_COUNTRIES_PARTITIONS_PATH,
+        SUMMARY_COUNTRIES_ANALYTICS_PATH,
+        ("country", "date"),
+        None,
+        GOOGLE_METRICS + APPLE_METRICS,
+    ),
+}
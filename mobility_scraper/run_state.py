@@ -0,0 +1,55 @@
+from pathlib import Path
+import json
+import threading
+
+from .paths_and_URLs import RUN_STATE_PATH
+
+# stages of the pipeline may update the state from different threads
+_lock = threading.Lock()
+
+
+def read_run_state(path=RUN_STATE_PATH):
+    """Read state of previous runs
+
+    Args:
+        path: location of the run state file
+
+    Returns:
+        dict: run state (keys are data providers, values are dicts with their state)
+    """
+    path = Path(path)
+    if not path.is_file():
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def update_run_state(source, path=RUN_STATE_PATH, **values):
+    """Update state of the data provider (the file is replaced atomically)
+
+    Args:
+        source (str): name of data provider
+        path: location of the run state file
+        values: new values of the state (e.g. last_date="2021-01-01")
+    """
+    path = Path(path)
+    with _lock:
+        state = read_run_state(path)
+        state.setdefault(source, {}).update(values)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        tmp_path.replace(path)
+
+
+def get_last_date(source, path=RUN_STATE_PATH):
+    """Get the last published date of the data provider
+
+    Args:
+        source (str): name of data provider
+        path: location of the run state file
+
+    Returns:
+        str: the last published date (None if it's unknown)
+    """
+    return read_run_state(path).get(source, {}).get("last_date")
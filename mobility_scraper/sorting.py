@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+
+def is_sorted_by(df, keys):
+    """Check if DataFrame is already sorted by key columns (lexicographically)
+
+    Args:
+        df (DataFrame): dataframe which needs to be checked
+        keys (list): key columns
+
+    Returns:
+        bool: flag indicating whether or not rows are in key order
+    """
+    if len(df) < 2:
+        return True
+    return pd.MultiIndex.from_frame(df.loc[:, keys]).is_monotonic_increasing
+
+
+def sort_by_keys(df, keys):
+    """Sort DataFrame by key columns, skipping the sort if rows are already in key order
+
+    Args:
+        df (DataFrame): dataframe which needs to be sorted
+        keys (list): key columns
+
+    Returns:
+        DataFrame: sorted dataframe with a fresh index
+    """
+    if not is_sorted_by(df, keys):
+        df = df.sort_values(by=keys, kind="mergesort")
+    return df.reset_index(drop=True)
+
+
+def merge_sorted_runs(frames, keys):
+    """Merge DataFrames which are each sorted by key columns into one sorted DataFrame
+
+    Every key column is factorized over all runs and combined into a single integer key,
+    so the final ordering is a stable sort of already sorted runs (timsort merges them in linear time).
+    If the runs don't overlap (e.g. new data is appended after historical), no sorting is done at all.
+
+    Args:
+        frames (iterable): dataframes sorted by key columns
+        keys (list): key columns
+
+    Returns:
+        DataFrame: merged dataframe sorted by key columns
+    """
+    frames = [frame for frame in frames if len(frame) > 0]
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames, ignore_index=True)
+    if len(frames) == 1 or is_sorted_by(merged, keys):
+        return merged
+    combined_key = np.zeros(len(merged), dtype=np.int64)
+    key_space = 1
+    for key in keys:
+        codes, uniques = pd.factorize(merged[key], sort=True)
+        key_space *= len(uniques) + 1
+        if key_space >= 2 ** 63:
+            # combined key doesn't fit into int64
+            return sort_by_keys(merged, keys)
+        # missing values are placed at the end as in sort_values
+        codes = np.where(codes < 0, len(uniques), codes)
+        combined_key = combined_key * (len(uniques) + 1) + codes
+    order = np.argsort(combined_key, kind="stable")
+    return merged.take(order).reset_index(drop=True)
@@ -0,0 +1,260 @@
+from pathlib import Path
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from .paths_and_URLs import MANIFEST_FILE
+
+# size of the end of the file which is hashed by csv_signature
+SIGNATURE_TAIL_SIZE = 64 * 1024
+
+
+def read_manifest(directory):
+    """Read manifest of the partitioned dataset
+
+    Args:
+        directory: directory of the partitioned dataset
+
+    Returns:
+        dict: manifest (an empty manifest if the dataset doesn't exist yet)
+    """
+    manifest_path = Path(directory, MANIFEST_FILE)
+    if not manifest_path.is_file():
+        return {"columns": [], "partitions": {}}
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, directory):
+    """Write manifest of the partitioned dataset (atomically)
+
+    Args:
+        manifest (dict): manifest
+        directory: directory of the partitioned dataset
+    """
+    manifest_path = Path(directory, MANIFEST_FILE)
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(manifest_path)
+
+
+def partition_path(name):
+    """Get relative path of the partition file (source/year/month layout)
+
+    Args:
+        name (str): partition name in "YYYY-MM" format
+
+    Returns:
+        str: relative path of the partition file
+    """
+    return name[:4] + "/" + name + ".csv"
+
+
+def csv_signature(path, tail_size=SIGNATURE_TAIL_SIZE):
+    """Get a cheap signature of the CSV report: its size and sha256 hash of its end.
+    Reports are sorted by keys with dates last, so new dates and most revisions change the signature.
+    Modification times aren't used, because a fresh checkout of the repository resets them
+
+    Args:
+        path: location of the CSV report
+        tail_size (int): number of bytes at the end of the file which are hashed
+
+    Returns:
+        list: size of the file and hash of its end (None if the file doesn't exist)
+    """
+    path = Path(path)
+    if not path.is_file():
+        return None
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        f.seek(max(size - tail_size, 0))
+        return [size, hashlib.sha256(f.read()).hexdigest()]
+
+
+def partitions_are_current(directory, csv_path):
+    """Check if the partitioned dataset holds the current version of the report:
+    the monolithic CSV report hasn't been rewritten since partitions were written
+
+    Args:
+        directory: directory of the partitioned dataset
+        csv_path: location of the monolithic CSV report
+
+    Returns:
+        bool: flag indicating whether or not the partitioned dataset should be read instead of CSV
+    """
+    if not Path(directory, MANIFEST_FILE).is_file():
+        return False
+    manifest = read_manifest(directory)
+    return manifest.get("csv_signature") == csv_signature(csv_path)
+
+
+def read_report(csv_path, partitions_path):
+    """Read the current version of the report from the partitioned dataset or the monolithic CSV report
+
+    Args:
+        csv_path: location of the monolithic CSV report
+        partitions_path: directory of the partitioned dataset of the report
+
+    Returns:
+        DataFrame: report
+    """
+    if partitions_are_current(partitions_path, csv_path):
+        return read_partitioned(partitions_path)
+    return pd.read_csv(csv_path, low_memory=False)
+
+
+def partition_hashes(df, date_column="date"):
+    """Hash monthly partitions of DataFrame. Rows are hashed in a vectorized way (hash_pandas_object),
+    a partition hash is sha256 of its row hashes in the row order. Hashes depend on values and dtypes.
+
+    Args:
+        df (DataFrame): dataframe
+        date_column (str): name of the date column
+
+    Returns:
+        dict: number of rows and sha256 hash of each partition by names ("YYYY-MM")
+    """
+    if len(df) == 0:
+        return {}
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    months = pd.to_datetime(df[date_column], errors="coerce").to_numpy()
+    months = months.astype("datetime64[M]")
+    order = np.argsort(months, kind="stable")
+    months, row_hashes = months[order], row_hashes[order]
+    names, starts, counts = np.unique(months, return_index=True, return_counts=True)
+    partitions = {}
+    for name, start, count in zip(names, starts, counts):
+        digest = hashlib.sha256(row_hashes[start : start + count].tobytes()).hexdigest()
+        partitions[str(name)] = [int(count), digest]
+    return partitions
+
+
+def write_partitioned(df, directory, date_column="date", csv_path=None):
+    """Write DataFrame as a dataset partitioned by months with a manifest.
+    Only partitions whose content has changed (see partition_hashes) are serialized and rewritten on disk.
+
+    The manifest keeps the signature of the monolithic CSV report at the time of writing. If the CSV report
+    is rewritten later without partitions, it's newer and readers use it instead (see partitions_are_current).
+
+    Args:
+        df (DataFrame): dataframe which needs to be written
+        directory: directory of the partitioned dataset. If directory doesn't exist, it will be created
+        date_column (str): name of the date column
+        csv_path (optional): location of the monolithic CSV report with the same data
+
+    Returns:
+        list: names of rewritten partitions
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(directory)
+    old_partitions = manifest["partitions"]
+    new_partitions = {}
+    written = []
+    dates = pd.to_datetime(df[date_column])
+    hashes = partition_hashes(df, date_column)
+    for name, partition in df.groupby(dates.dt.strftime("%Y-%m"), sort=True):
+        _, digest = hashes[name]
+        path = partition_path(name)
+        partition_dates = dates.loc[partition.index]
+        new_partitions[name] = {
+            "path": path,
+            "rows": len(partition),
+            "min_date": partition_dates.min().strftime("%Y-%m-%d"),
+            "max_date": partition_dates.max().strftime("%Y-%m-%d"),
+            "sha256": digest,
+        }
+        file_path = directory / path
+        if old_partitions.get(name, {}).get("sha256") == digest and file_path.is_file():
+            continue
+        file_path.parent.mkdir(exist_ok=True)
+        file_path.write_bytes(partition.to_csv(index=False).encode())
+        written.append(name)
+    # delete partitions which are no longer present in data
+    for name, partition in old_partitions.items():
+        if name not in new_partitions:
+            Path(directory, partition["path"]).unlink(missing_ok=True)
+    manifest["columns"] = list(df.columns)
+    manifest["date_column"] = date_column
+    manifest["partitions"] = new_partitions
+    manifest["csv_signature"] = None if csv_path is None else csv_signature(csv_path)
+    write_manifest(manifest, directory)
+    return written
+
+
+def select_partitions(manifest, start_date=None, end_date=None):
+    """Select partitions which may contain data in the date range (using manifest statistics)
+
+    Args:
+        manifest (dict): manifest of the partitioned dataset
+        start_date (str, optional): first date (inclusive) in "YYYY-MM-DD" format
+        end_date (str, optional): last date (inclusive) in "YYYY-MM-DD" format
+
+    Returns:
+        list: names of selected partitions in chronological order
+    """
+    selected = []
+    for name in sorted(manifest["partitions"]):
+        partition = manifest["partitions"][name]
+        if start_date is not None and partition["max_date"] < str(start_date):
+            continue
+        if end_date is not None and partition["min_date"] > str(end_date):
+            continue
+        selected.append(name)
+    return selected
+
+
+def iter_partitions(directory, start_date=None, end_date=None, usecols=None):
+    """Iterate over partitions of the dataset which may contain data in the date range
+
+    Args:
+        directory: directory of the partitioned dataset
+        start_date (str, optional): first date (inclusive) in "YYYY-MM-DD" format
+        end_date (str, optional): last date (inclusive) in "YYYY-MM-DD" format
+        usecols (list, optional): columns which need to be read. If None - all columns
+
+    Yields:
+        DataFrame: data of a single partition (rows aren't filtered by date)
+    """
+    manifest = read_manifest(directory)
+    for name in select_partitions(manifest, start_date, end_date):
+        yield pd.read_csv(
+            Path(directory, manifest["partitions"][name]["path"]),
+            usecols=usecols,
+            low_memory=False,
+        )
+
+
+def read_partitioned(directory, start_date=None, end_date=None, columns=None):
+    """Read partitioned dataset. Partitions outside the date range aren't read at all.
+
+    Args:
+        directory: directory of the partitioned dataset
+        start_date (str, optional): first date (inclusive) in "YYYY-MM-DD" format
+        end_date (str, optional): last date (inclusive) in "YYYY-MM-DD" format
+        columns (list, optional): columns which need to be read. If None - all columns
+
+    Returns:
+        DataFrame: data from selected partitions
+    """
+    manifest = read_manifest(directory)
+    date_column = manifest.get("date_column", "date")
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys([date_column] + list(columns)))
+    frames = []
+    for partition in iter_partitions(directory, start_date, end_date, usecols):
+        if start_date is not None:
+            partition = partition[partition[date_column] >= str(start_date)]
+        if end_date is not None:
+            partition = partition[partition[date_column] <= str(end_date)]
+        frames.append(partition)
+    if not frames:
+        return pd.DataFrame(columns=usecols or manifest["columns"])
+    data = pd.concat(frames, ignore_index=True)
+    if columns is not None:
+        data = data.loc[:, list(columns)]
+    return data
@@ -0,0 +1,133 @@
+"""
+Lightweight checks of data updates. This module uses only the standard library,
+so checks don't pay the import cost of pandas and processing modules.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import json
+import urllib.request
+
+from .paths_and_URLs import (
+    APPLE_BASE_URL,
+    APPLE_INDEX_URL,
+    RUN_STATE_PATH,
+    TOMTOM_API_URL,
+    TOMTOM_CHECK_CITY,
+)
+from .run_state import get_last_date, update_run_state
+
+
+def get_apple_link():
+    """Get link of Apple Mobility Trends report file
+
+    Returns:
+        link (str): link of Apple Mobility Trends report file
+    """
+    # get link via API
+    with urllib.request.urlopen(APPLE_INDEX_URL) as url:
+        json_data = json.loads(url.read().decode())
+    link = (
+        APPLE_BASE_URL + json_data["basePath"] + json_data["regions"]["en-us"]["csvPath"]
+    )
+    return link
+
+
+def get_tomtom_city_stats(api_key):
+    """Get daily stats of the city from TomTom API
+
+    Args:
+        api_key (str): API key of the city (Alpha3 country code and city key, e.g. "JPN_tokyo")
+
+    Returns:
+        list: daily stats (dicts with "date", "congestion", "diffRatio" etc.)
+    """
+    with urllib.request.urlopen(TOMTOM_API_URL + api_key) as url:
+        return json.loads(url.read().decode())
+
+
+def get_last_report_date(report_source, date_column="date"):
+    """Get the last date of the CSV report without loading it into DataFrame
+
+    Args:
+        report_source: location of the report in CSV format
+        date_column (str): name of the date column
+
+    Returns:
+        str: the last date in the report (None if the report is empty)
+    """
+    with open(report_source, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if date_column not in header:
+            return None
+        date_position = header.index(date_column)
+        return max((row[date_position] for row in reader if row), default=None)
+
+
+def get_tomtom_last_dates(api_keys, max_workers=8):
+    """Get the last available dates of cities from TomTom API (requests are sent concurrently)
+
+    Args:
+        api_keys (iterable): API keys of cities
+        max_workers (int): maximum number of concurrent requests
+
+    Returns:
+        dict: the last available date for each city (None if request failed or there is no data)
+    """
+
+    def last_date(api_key):
+        try:
+            json_data = get_tomtom_city_stats(api_key)
+        except (OSError, ValueError):
+            return None
+        if not json_data or not isinstance(json_data, list):
+            return None
+        return json_data[-1]["date"]
+
+    api_keys = list(dict.fromkeys(api_keys))
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(api_keys))) as executor:
+        return dict(zip(api_keys, executor.map(last_date, api_keys)))
+
+
+def check_tomtom_update(
+    tomtom_source,
+    api_key_check=TOMTOM_CHECK_CITY,
+    sample=None,
+    run_state_path=RUN_STATE_PATH,
+):
+    """Check if new TomTom data available
+
+    The last published date is taken from the run state file (the report is read only if the state is unknown).
+
+    Args:
+        tomtom_source: location of the TomTom report in CSV format (if exist)
+        api_key_check: which city will be checked on the TomTom site
+        sample (iterable, optional): API keys of several cities which are checked concurrently
+                                     instead of the single city
+        run_state_path: location of the run state file
+    Returns:
+        new_files (bool): flag indicating whether or not new data available
+    """
+    new_files = False
+    # get the last published date (the report may be published only as the partitioned dataset)
+    last_report_date = get_last_date("tomtom", run_state_path)
+    if last_report_date is None and tomtom_source.is_file():
+        last_report_date = get_last_report_date(tomtom_source)
+        update_run_state("tomtom", run_state_path, last_date=last_report_date)
+    # check if the report is available
+    if last_report_date is None:
+        new_files = True
+    else:
+        # get last available dates from API
+        api_keys = (api_key_check,) if sample is None else tuple(sample)
+        last_api_dates = [
+            date for date in get_tomtom_last_dates(api_keys).values() if date
+        ]
+        if not last_api_dates:
+            raise ConnectionError("TomTom API: no data for " + ", ".join(api_keys))
+        # dates are in "YYYY-MM-DD" format, so they are compared as strings
+        # (a city which lags behind the report doesn't mean new data)
+        if any(date > last_report_date for date in last_api_dates):
+            new_files = True
+
+    return new_files
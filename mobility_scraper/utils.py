@@ -1,20 +1,33 @@
-import pandas as pd
 import zipfile as zp
 
+# maximum number of rows in an Excel sheet (without the header)
+EXCEL_MAX_ROWS = 1048575
+
 
 def write_df_to_csv_and_excel(df, paths):
-    """Write Pandas Dataframe to CSV and Excel
+    """Write Pandas Dataframe to CSV and Excel. If the dataframe doesn't fit into an Excel sheet,
+    it's split by years (the dataframe itself isn't modified)
 
     Args:
         df (DataFrame): dataframe which needs to be written
         paths (dict): dictionary where keys are extensions, values are paths
     """
+    # pandas is imported here, so that other helpers don't pay its import cost
+    import pandas as pd
+
     df.to_csv(paths[".csv"], index=False)
-    if len(df) < 1048576:
-        df.to_excel(paths[".xlsx"], index=False, sheet_name="Data", engine="xlsxwriter")
+    if len(df) <= EXCEL_MAX_ROWS:
+        writer = pd.ExcelWriter(  # pylint: disable=abstract-class-instantiated
+            paths[".xlsx"],
+            engine="xlsxwriter",
+            datetime_format="yyyy-mm-dd",
+        )
+        df.to_excel(writer, index=False, sheet_name="Data")
+        writer.close()
     else:
         # split data by years
-        df.loc[:, "date"] = pd.to_datetime(df.loc[:, "date"])
+        # the caller's dataframe may still be used (e.g. for merging), so dates are converted in a copy
+        df = df.assign(date=pd.to_datetime(df["date"]))
         writer = pd.ExcelWriter(  # pylint: disable=abstract-class-instantiated
             paths[".xlsx"],
             engine="xlsxwriter",
@@ -28,7 +41,7 @@ def write_df_to_csv_and_excel(df, paths):
                 index=False,
                 sheet_name=str(year),
             )
-        writer.save()
+        writer.close()
 
 
 def exception_handler(name):
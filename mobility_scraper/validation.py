@@ -0,0 +1,294 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .report_schemas import APPLE_METRICS, GOOGLE_METRICS, WAZE_METRICS
+from .storage import partition_hashes
+
+# allowed ranges of metric values (None - unbounded)
+METRIC_RANGES = {
+    **{metric: (-100, None) for metric in GOOGLE_METRICS},  # % change from baseline
+    **{metric: (-100, None) for metric in APPLE_METRICS},  # index - 100 (% change)
+    **{metric: (-100, None) for metric in WAZE_METRICS},  # % change of driven distance
+    # TomTom metrics
+    "congestion": (0, None),  # % of extra travel time
+    "diffRatio": (-1, None),  # change of congestion compared to 2019
+}
+# gaps between dates of the same entity (in days) which are reported as warnings
+MAX_GAP_DAYS = 1
+# maximum share of rows which may disappear compared to the previous output
+MAX_ROW_DROP = 0.01
+
+ValidationResult = namedtuple(
+    "ValidationResult", ["errors", "warnings", "partitions", "diff"]
+)
+ValidationResult.__doc__ = """Result of the report validation
+
+    Args:
+        errors (list): problems which must block publishing of the report
+        warnings (list): suspicious properties of the report which don't block publishing
+        partitions (dict): rows and hashes of monthly partitions of the report (see partition_hashes)
+        diff (dict): changes of partitions compared to the previous output (see diff_partitions)
+"""
+
+
+def check_schema(report, keys, metrics):
+    """Check that the report has all key and metric columns and metric columns are numeric
+
+    Args:
+        report (DataFrame): report which needs to be checked
+        keys (iterable): key columns (the date column is the last one)
+        metrics (iterable): metric columns
+
+    Returns:
+        list: found problems
+    """
+    if len(report) == 0:
+        return ["report is empty"]
+    problems = []
+    missing = [column for column in [*keys, *metrics] if column not in report.columns]
+    if missing:
+        problems.append("missing columns: " + ", ".join(missing))
+    for metric in metrics:
+        if metric not in report.columns:
+            continue
+        if not pd.api.types.is_numeric_dtype(report[metric]):
+            problems.append("column {} isn't numeric".format(metric))
+        elif report[metric].isna().all():
+            problems.append("column {} has no values".format(metric))
+    date_key = keys[-1]
+    if date_key in report.columns:
+        invalid_dates = pd.to_datetime(report[date_key], errors="coerce").isna().sum()
+        if invalid_dates:
+            problems.append(
+                "{} rows with missing or invalid dates".format(invalid_dates)
+            )
+    return problems
+
+
+def check_unique_keys(report, keys):
+    """Check that key columns identify rows of the report
+
+    Args:
+        report (DataFrame): report which needs to be checked
+        keys (iterable): key columns
+
+    Returns:
+        list: found problems
+    """
+    duplicated = report.duplicated(list(keys), keep="first")
+    if not duplicated.any():
+        return []
+    example = report.loc[duplicated.idxmax(), list(keys)].tolist()
+    return [
+        "{} rows with duplicated keys (e.g. {})".format(
+            duplicated.sum(), ", ".join(map(str, example))
+        )
+    ]
+
+
+def check_date_continuity(report, keys, max_gap_days=MAX_GAP_DAYS):
+    """Check that dates of every entity (rows with the same non-date keys) have no gaps
+
+    Args:
+        report (DataFrame): report which needs to be checked
+        keys (iterable): key columns (the date column is the last one)
+        max_gap_days (int): maximum allowed difference between consecutive dates of the entity
+
+    Returns:
+        list: found problems
+    """
+    keys = list(keys)
+    entity_keys, date_key = keys[:-1], keys[-1]
+    days = pd.to_datetime(report[date_key], errors="coerce").to_numpy()
+    valid = ~np.isnat(days)
+    days = days[valid].astype("datetime64[D]").astype(np.int64)
+    if entity_keys:
+        groups = report.loc[valid].groupby(entity_keys, sort=False, dropna=False)
+        codes = groups.ngroup().to_numpy()
+    else:
+        codes = np.zeros(len(days), dtype=np.int64)
+    if len(days) < 2:
+        return []
+    order = np.lexsort((days, codes))
+    codes, days = codes[order], days[order]
+    gaps = np.diff(days)
+    gaps[codes[1:] != codes[:-1]] = 0
+    too_long = gaps > max_gap_days
+    if not too_long.any():
+        return []
+    entities = len(np.unique(codes[1:][too_long]))
+    longest = int(np.argmax(gaps))
+    example = report.loc[valid].iloc[order[longest + 1]]
+    return [
+        (
+            "{} entities have gaps in dates longer than {} days "
+            "(the longest: {} days before {} for {})"
+        ).format(
+            entities,
+            max_gap_days,
+            gaps[longest],
+            np.datetime64(int(days[longest + 1]), "D"),
+            ", ".join(str(example[key]) for key in entity_keys) or "report",
+        )
+    ]
+
+
+def check_value_ranges(report, metrics, ranges=METRIC_RANGES):
+    """Check that metric values are finite and within allowed ranges (missing values are allowed)
+
+    Args:
+        report (DataFrame): report which needs to be checked
+        metrics (iterable): metric columns
+        ranges (dict): allowed ranges of values (min, max) by metric names
+
+    Returns:
+        list: found problems
+    """
+    problems = []
+    for metric in metrics:
+        if metric not in report.columns or not pd.api.types.is_numeric_dtype(
+            report[metric]
+        ):
+            continue
+        values = report[metric].to_numpy(dtype=np.float64)
+        infinite = np.isinf(values).sum()
+        if infinite:
+            problems.append("{} infinite values in {}".format(infinite, metric))
+        low, high = ranges.get(metric, (None, None))
+        with np.errstate(invalid="ignore"):
+            if low is not None and (values < low).any():
+                problems.append(
+                    "{} values of {} are below {} (min: {})".format(
+                        (values < low).sum(), metric, low, np.nanmin(values)
+                    )
+                )
+            if high is not None and (values > high).any():
+                problems.append(
+                    "{} values of {} are above {} (max: {})".format(
+                        (values > high).sum(), metric, high, np.nanmax(values)
+                    )
+                )
+    return problems
+
+
+def diff_partitions(previous, current):
+    """Compare partition hashes of the previous and the current output
+
+    Args:
+        previous (dict): partition hashes of the previous output (see partition_hashes)
+        current (dict): partition hashes of the current output
+
+    Returns:
+        dict: names of "added", "removed", "changed" and "unchanged" partitions and "rows" difference
+    """
+    previous = previous or {}
+    return {
+        "added": sorted(set(current) - set(previous)),
+        "removed": sorted(set(previous) - set(current)),
+        "changed": sorted(
+            name
+            for name in set(current) & set(previous)
+            if current[name][1] != previous[name][1]
+        ),
+        "unchanged": sorted(
+            name
+            for name in set(current) & set(previous)
+            if current[name][1] == previous[name][1]
+        ),
+        "rows": sum(rows for rows, _ in current.values())
+        - sum(rows for rows, _ in previous.values()),
+    }
+
+
+def diff_summary(diff, max_names=3):
+    """Create a compact summary of changes
+
+    Args:
+        diff (dict): changes of partitions (see diff_partitions)
+        max_names (int): maximum number of listed partition names per kind of change
+
+    Returns:
+        str: summary of changes
+    """
+
+    def names(partitions):
+        listed = ", ".join(partitions[:max_names])
+        if len(partitions) > max_names:
+            listed += ", ..."
+        return listed
+
+    parts = []
+    for kind in ["added", "removed", "changed"]:
+        if diff[kind]:
+            parts.append("{} {} ({})".format(len(diff[kind]), kind, names(diff[kind])))
+    parts.append("{} unchanged".format(len(diff["unchanged"])))
+    parts.append("rows {:+d}".format(diff["rows"]))
+    return "partitions: " + ", ".join(parts)
+
+
+def validate_report(
+    report,
+    keys,
+    metrics,
+    previous_partitions=None,
+    previous_last_date=None,
+    max_gap_days=MAX_GAP_DAYS,
+    max_row_drop=MAX_ROW_DROP,
+    accept_changes=False,
+):
+    """Validate the report before publishing and compare it with the previous output
+
+    Errors: schema problems, duplicated keys, values out of ranges, the last date earlier than
+    the previously published one, removed partitions or a drop of rows (e.g. a truncated download).
+    Warnings: gaps in dates of entities.
+    If changes are accepted, problems compared to the previous output are warnings too
+    (e.g. a provider legitimately dropped regions).
+
+    Args:
+        report (DataFrame): report which needs to be validated
+        keys (iterable): key columns (the date column is the last one)
+        metrics (iterable): metric columns
+        previous_partitions (dict, optional): partition hashes of the previous output
+        previous_last_date (str, optional): the last date of the previous output
+        max_gap_days (int): maximum allowed difference between consecutive dates of the entity
+        max_row_drop (float): maximum share of rows which may disappear compared to the previous output
+        accept_changes (bool): don't block the report because of removed dates, partitions or rows
+
+    Returns:
+        ValidationResult: found problems, partition hashes and changes compared to the previous output
+    """
+    keys = list(keys)
+    errors = check_schema(report, keys, metrics)
+    if errors:
+        # other checks rely on the schema
+        diff = diff_partitions(previous_partitions, {})
+        return ValidationResult(errors, [], {}, diff)
+    errors += check_unique_keys(report, keys)
+    errors += check_value_ranges(report, metrics)
+    warnings = check_date_continuity(report, keys, max_gap_days)
+    # problems compared to the previous output
+    changes = []
+    last_date = pd.to_datetime(report[keys[-1]]).max()
+    if previous_last_date is not None and last_date < pd.Timestamp(previous_last_date):
+        changes.append(
+            "the last date {} is earlier than the previous one {}".format(
+                last_date.strftime("%Y-%m-%d"), previous_last_date
+            )
+        )
+    partitions = partition_hashes(report, keys[-1])
+    diff = diff_partitions(previous_partitions, partitions)
+    if previous_partitions:
+        if diff["removed"]:
+            changes.append("partitions were removed: " + ", ".join(diff["removed"]))
+        previous_rows = sum(rows for rows, _ in previous_partitions.values())
+        if -diff["rows"] > max_row_drop * previous_rows:
+            changes.append(
+                "{} of {} rows were removed".format(-diff["rows"], previous_rows)
+            )
+    if accept_changes:
+        warnings += changes
+    else:
+        errors += changes
+    return ValidationResult(errors, warnings, partitions, diff)
@@ -0,0 +1,592 @@
+"""
+This script runs a local stand-in of all data providers (Google, Apple, Waze and TomTom).
+It serves synthetic payloads in the formats of real providers with injectable latency and failures.
+
+The scraper uses it instead of real providers if MOBILITY_MOCK_PROVIDERS_URL environment variable is set
+to the base URL of the server (e.g. http://127.0.0.1:8000).
+
+This module uses only the standard library (and click for the command line), so importing it doesn't
+import the scraper package.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import csv
+import io
+import json
+import random
+import threading
+import time
+
+import click
+
+# synthetic countries: name, Alpha2 and Alpha3 codes, key of the main TomTom city
+MOCK_COUNTRIES = (
+    ("Japan", "JP", "JPN", "tokyo"),
+    ("United States", "US", "USA", "new-york"),
+    ("United Kingdom", "GB", "GBR", "london"),
+    ("France", "FR", "FRA", "paris"),
+    ("Germany", "DE", "DEU", "berlin"),
+    ("Brazil", "BR", "BRA", "sao-paulo"),
+    ("Australia", "AU", "AUS", "sydney"),
+    ("Italy", "IT", "ITA", "rome"),
+    ("Spain", "ES", "ESP", "madrid"),
+    ("Canada", "CA", "CAN", "toronto"),
+    ("Mexico", "MX", "MEX", "mexico-city"),
+    ("Poland", "PL", "POL", "warsaw"),
+    ("India", "IN", "IND", "mumbai"),
+    ("Turkey", "TR", "TUR", "istanbul"),
+    ("Argentina", "AR", "ARG", "buenos-aires"),
+    ("Netherlands", "NL", "NLD", "amsterdam"),
+)
+GOOGLE_METRIC_COLUMNS = (
+    "retail_and_recreation_percent_change_from_baseline",
+    "grocery_and_pharmacy_percent_change_from_baseline",
+    "parks_percent_change_from_baseline",
+    "transit_stations_percent_change_from_baseline",
+    "workplaces_percent_change_from_baseline",
+    "residential_percent_change_from_baseline",
+)
+APPLE_TRANSPORTATION_TYPES = ("driving", "transit", "walking")
+APPLE_CSV_PATH = "/covid19-mobility-data/mock/v3/en-us/applemobilitytrends.csv"
+
+ProviderConfig = namedtuple(
+    "ProviderConfig",
+    [
+        "countries",
+        "regions",
+        "cities",
+        "days",
+        "start_date",
+        "latency",
+        "jitter",
+        "failure_rate",
+        "fail_paths",
+        "seed",
+    ],
+)
+ProviderConfig.__new__.__defaults__ = (8, 10, 3, 120, "2022-01-01", 0.0, 0.0, 0.0, (), 0)
+ProviderConfig.__doc__ = """Configuration of synthetic payloads and injected faults
+
+    Args:
+        countries (int): number of countries (at most len(MOCK_COUNTRIES))
+        regions (int): number of subregions of every country
+        cities (int): number of cities (counties in the US) of every subregion and TomTom cities of every country
+        days (int): number of days of data
+        start_date (str): first date of data in "YYYY-MM-DD" format
+        latency (float): delay of every response in seconds
+        jitter (float): maximum random addition to the delay in seconds
+        failure_rate (float): probability that the request fails with 503 status
+        fail_paths (tuple): substrings of paths which always fail with 503 status (e.g. "tomtom/dailyStats")
+        seed (int): seed of random values. Values depend only on the seed, the place and the date,
+                    so more days only append data to the same payloads
+"""
+
+ProviderRequest = namedtuple(
+    "ProviderRequest", ["provider", "path", "status", "bytes", "start", "end"]
+)
+ProviderRequest.__doc__ = """Record of the served request
+
+    Args:
+        provider (str): name of data provider (the first part of the path)
+        path (str): requested path
+        status (int): HTTP status of the response
+        bytes (int): size of the response body
+        start (float): time.perf_counter() when the request was received
+        end (float): time.perf_counter() when the response was sent
+"""
+
+
+def mock_dates(config):
+    """Get dates of synthetic data
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        list: dates
+    """
+    start = date.fromisoformat(config.start_date)
+    return [start + timedelta(days=day) for day in range(config.days)]
+
+
+def mock_countries(config):
+    """Get synthetic countries
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        tuple: countries (name, Alpha2 and Alpha3 codes, key of the main TomTom city)
+    """
+    return MOCK_COUNTRIES[: config.countries]
+
+
+def mock_random(config, *key):
+    """Get a random generator of values which are identified by the key (e.g. provider, place and date)
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+        *key: parts of the key
+
+    Returns:
+        random.Random: random generator
+    """
+    return random.Random("|".join(map(str, (config.seed, *key))))
+
+
+def write_csv(rows, header):
+    """Write rows to CSV
+
+    Args:
+        rows (iterable): rows
+        header (list): column names
+
+    Returns:
+        bytes: CSV content
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def google_payload(config):
+    """Build raw Google report (Global_Mobility_Report.csv)
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        bytes: CSV content
+    """
+    dates = [day.isoformat() for day in mock_dates(config)]
+    places = []
+    for name, alpha2, _, _ in mock_countries(config):
+        places.append((alpha2, name, "", ""))
+        for region in range(1, config.regions + 1):
+            region_name = "Region {}".format(region)
+            places.append((alpha2, name, region_name, ""))
+            if name == "United States":
+                for county in range(1, config.cities + 1):
+                    places.append(
+                        (alpha2, name, region_name, "County {}".format(county))
+                    )
+
+    def metrics(place, day):
+        rng = mock_random(config, "google", *place, day)
+        # Google leaves some values empty
+        return [
+            "" if rng.random() < 0.05 else rng.randint(-80, 80)
+            for _ in GOOGLE_METRIC_COLUMNS
+        ]
+
+    rows = (
+        [*place, "", "", "", "", day, *metrics(place, day)]
+        for place in places
+        for day in dates
+    )
+    header = [
+        "country_region_code",
+        "country_region",
+        "sub_region_1",
+        "sub_region_2",
+        "metro_area",
+        "iso_3166_2_code",
+        "census_fips_code",
+        "place_id",
+        "date",
+        *GOOGLE_METRIC_COLUMNS,
+    ]
+    return write_csv(rows, header)
+
+
+def apple_payload(config):
+    """Build raw Apple report (dates are columns)
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        bytes: CSV content
+    """
+    dates = [day.isoformat() for day in mock_dates(config)]
+    places = []
+    for name, _, _, _ in mock_countries(config):
+        places.append(("country/region", name, "", ""))
+        for region in range(1, config.regions + 1):
+            region_name = "Region {}".format(region)
+            places.append(("sub-region", region_name, "", name))
+            for city in range(1, config.cities + 1):
+                geo_type = "county" if name == "United States" else "city"
+                city_name = "{} {}-{}".format(geo_type.title(), region, city)
+                places.append((geo_type, city_name, region_name, name))
+    rows = (
+        [
+            geo_type,
+            region,
+            transportation_type,
+            "",
+            sub_region,
+            country,
+            *(
+                round(
+                    mock_random(
+                        config, "apple", country, region, transportation_type, day
+                    ).uniform(20, 200),
+                    2,
+                )
+                for day in dates
+            ),
+        ]
+        for geo_type, region, sub_region, country in places
+        for transportation_type in APPLE_TRANSPORTATION_TYPES
+    )
+    header = [
+        "geo_type",
+        "region",
+        "transportation_type",
+        "alternative_name",
+        "sub-region",
+        "country",
+        *dates,
+    ]
+    return write_csv(rows, header)
+
+
+def waze_payloads(config):
+    """Build raw Waze country-level and city-level reports
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        tuple: CSV contents of country-level and city-level reports
+    """
+    dates = [
+        (day.strftime("%b %d, %Y").replace(" 0", " "), day)
+        for day in mock_dates(config)
+    ]
+    countries = [name for name, _, _, _ in mock_countries(config)]
+    change = "% Change In Waze Driven Miles/KMs"
+
+    def value(*place):
+        return round(mock_random(config, "waze", *place).uniform(-0.9, 0.5), 2)
+
+    country_rows = (
+        [day, country, value(country, iso_day)]
+        for day, iso_day in dates
+        for country in countries
+    )
+    city_rows = (
+        [
+            day,
+            country,
+            "City {}".format(city),
+            value(country, "City {}".format(city), iso_day),
+        ]
+        for day, iso_day in dates
+        for country in countries
+        for city in range(1, config.cities + 1)
+    )
+    return (
+        write_csv(country_rows, ["Date", "Country", change]),
+        write_csv(city_rows, ["Date", "Country", "City", change]),
+    )
+
+
+def tomtom_cities(config):
+    """Get synthetic TomTom cities
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        list: cities (country name, Alpha2 and Alpha3 codes, city key)
+    """
+    cities = []
+    for name, alpha2, alpha3, main_city in mock_countries(config):
+        cities.append((name, alpha2, alpha3, main_city))
+        for city in range(2, config.cities + 1):
+            cities.append((name, alpha2, alpha3, "{}-{}".format(main_city, city)))
+    return cities
+
+
+def tomtom_stats(config, city, dates):
+    """Build daily stats of the TomTom city
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+        city (str): API key of the city
+        dates (list): dates
+
+    Returns:
+        list: daily stats in the format of TomTom API
+    """
+    stats = []
+    for day in dates:
+        rng = mock_random(config, "tomtom", city, day)
+        congestion = rng.randint(5, 60)
+        stats.append(
+            {
+                "date": day.isoformat(),
+                "congestion": congestion,
+                "diffRatio": round(rng.uniform(-0.8, 0.3), 4),
+                "week": day.isocalendar()[1],
+            }
+        )
+    return stats
+
+
+def tomtom_payloads(config):
+    """Build TomTom page data (list of cities) and daily stats of every city
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        dict: JSON contents by paths (relative to "/tomtom")
+    """
+    dates = mock_dates(config)
+    edges = []
+    payloads = {}
+    for country, alpha2, alpha3, key in tomtom_cities(config):
+        node = {
+            "name": key.replace("-", " ").title(),
+            "country": alpha2,
+            "countryName": country,
+            "continent": "Mock",
+            "key": key,
+        }
+        edges.append({"node": node})
+        api_key = alpha3 + "_" + key
+        payloads["/dailyStats/" + api_key] = json.dumps(
+            tomtom_stats(config, api_key, dates)
+        ).encode()
+    page_data = {"result": {"data": {"allCitiesJson": {"edges": edges}}}}
+    payloads["/page-data.json"] = json.dumps(page_data).encode()
+    return payloads
+
+
+def tomtom_historical_payload(config):
+    """Build historical TomTom data (the same cities for the days before the first date)
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        bytes: CSV content in the format of the TomTom report
+    """
+    start = date.fromisoformat(config.start_date) - timedelta(days=config.days)
+    dates = [start + timedelta(days=day) for day in range(config.days)]
+    rows = [
+        [country, key.replace("-", " ").title(), stats["date"]]
+        + [stats["congestion"], stats["diffRatio"]]
+        for country, _, alpha3, key in tomtom_cities(config)
+        for stats in tomtom_stats(config, alpha3 + "_" + key, dates)
+    ]
+    rows.sort()
+    return write_csv(rows, ["country", "city", "date", "congestion", "diffRatio"])
+
+
+def build_payloads(config):
+    """Build synthetic payloads of all providers
+
+    Args:
+        config (ProviderConfig): configuration of payloads
+
+    Returns:
+        dict: (content type, content) by paths
+    """
+    payloads = {
+        "/google/Global_Mobility_Report.csv": ("text/csv", google_payload(config))
+    }
+    apple_index = {
+        "basePath": "/covid19-mobility-data/mock/v3",
+        "regions": {"en-us": {"csvPath": "/en-us/applemobilitytrends.csv"}},
+    }
+    payloads["/apple/covid19-mobility-data/current/v3/index.json"] = (
+        "application/json",
+        json.dumps(apple_index).encode(),
+    )
+    payloads["/apple" + APPLE_CSV_PATH] = ("text/csv", apple_payload(config))
+    waze_countries, waze_cities = waze_payloads(config)
+    payloads["/waze/Waze_Country-Level_Data.csv"] = ("text/csv", waze_countries)
+    payloads["/waze/Waze_City-Level_Data.csv"] = ("text/csv", waze_cities)
+    for path, content in tomtom_payloads(config).items():
+        payloads["/tomtom" + path] = ("application/json", content)
+    return payloads
+
+
+class ProviderRequestHandler(BaseHTTPRequestHandler):
+    """Handler of requests to synthetic providers"""
+
+    def do_GET(self):
+        server = self.server
+        start = time.perf_counter()
+        path = self.path.split("?")[0]
+        config = server.config
+        delay = config.latency + server.random_value() * config.jitter
+        if delay > 0:
+            time.sleep(delay)
+        content_type, content = server.payloads.get(path, (None, None))
+        if any(part in path for part in config.fail_paths) or (
+            server.random_value() < config.failure_rate
+        ):
+            status, content_type, content = 503, "text/plain", b"Injected failure"
+        elif content is None:
+            status, content_type, content = 404, "text/plain", b"Not found"
+        else:
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        server.record(
+            ProviderRequest(
+                path.split("/")[1],
+                path,
+                status,
+                len(content),
+                start,
+                time.perf_counter(),
+            )
+        )
+
+    def log_message(self, format, *args):
+        # requests are recorded by the server
+        pass
+
+
+class MockProvidersServer(ThreadingHTTPServer):
+    """HTTP server of synthetic provider payloads with injectable latency and failures
+
+    Args:
+        address (tuple): host and port (0 - any free port)
+        config (ProviderConfig): configuration of payloads and faults
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, config=ProviderConfig()):
+        super().__init__(address, ProviderRequestHandler)
+        self._lock = threading.Lock()
+        self._random = random.Random(config.seed)
+        self.requests = []
+        self.configure(config)
+
+    @property
+    def url(self):
+        """str: base URL of the server"""
+        host, port = self.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def configure(self, config):
+        """Replace payloads and faults (e.g. add days of data between runs)
+
+        Args:
+            config (ProviderConfig): new configuration
+        """
+        payloads = build_payloads(config)
+        with self._lock:
+            self.config = config
+            self.payloads = payloads
+
+    def random_value(self):
+        """Get a random value in [0, 1) for injected faults
+
+        Returns:
+            float: random value
+        """
+        with self._lock:
+            return self._random.random()
+
+    def record(self, request):
+        """Record the served request
+
+        Args:
+            request (ProviderRequest): served request
+        """
+        with self._lock:
+            self.requests.append(request)
+
+    def take_requests(self):
+        """Get recorded requests and clear them
+
+        Returns:
+            list: served requests (ProviderRequest)
+        """
+        with self._lock:
+            requests, self.requests = self.requests, []
+        return requests
+
+
+def start_server(config=ProviderConfig(), host="127.0.0.1", port=0):
+    """Start the server in a background thread
+
+    Args:
+        config (ProviderConfig): configuration of payloads and faults
+        host (str): host of the server
+        port (int): port of the server (0 - any free port)
+
+    Returns:
+        MockProvidersServer: running server (stop it with shutdown())
+    """
+    server = MockProvidersServer((host, port), config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def provider_options(function):
+    """Add command line options of ProviderConfig"""
+    defaults = ProviderConfig()
+    options = [
+        click.option("--countries", default=defaults.countries, show_default=True),
+        click.option("--regions", default=defaults.regions, show_default=True),
+        click.option("--cities", default=defaults.cities, show_default=True),
+        click.option("--days", default=defaults.days, show_default=True),
+        click.option("--start-date", default=defaults.start_date, show_default=True),
+        click.option(
+            "--latency", default=defaults.latency, help="Delay of responses (s)"
+        ),
+        click.option(
+            "--jitter", default=defaults.jitter, help="Random addition to delay (s)"
+        ),
+        click.option(
+            "--failure-rate",
+            default=defaults.failure_rate,
+            help="Probability of 503 responses",
+        ),
+        click.option(
+            "--fail-path",
+            "fail_paths",
+            multiple=True,
+            help="Substring of paths which always fail",
+        ),
+        click.option("--seed", default=defaults.seed, show_default=True),
+    ]
+    for option in reversed(options):
+        function = option(function)
+    return function
+
+
+@click.command(help="Serve synthetic payloads of data providers")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8000, show_default=True)
+@provider_options
+def serve(host, port, **config):
+    config["fail_paths"] = tuple(config["fail_paths"])
+    server = MockProvidersServer((host, port), ProviderConfig(**config))
+    print("Serving mock providers at", server.url)
+    print("Run the scraper with MOBILITY_MOCK_PROVIDERS_URL=" + server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -8,17 +8,97 @@ Original data:
     - TomTom Traffic Index: https://www.tomtom.com/en_gb/traffic-index/ranking/
 
 """
+from functools import partial
+import sys
 import zipfile as zp
 
-from mobility_scraper import *
-
 import click
-import pandas as pd
 
+# only lightweight modules are imported here. Processing modules (and pandas) are imported
+# when their stage actually runs, so help and update checks start fast
+from mobility_scraper.paths_and_URLs import *
+from mobility_scraper.download_files import download_files, update_status_message
+from mobility_scraper.pipeline import (
+    Stage,
+    has_failures,
+    run_pipeline,
+    run_stage,
+    status_report,
+)
+from mobility_scraper.report_schemas import REPORT_SCHEMAS
+from mobility_scraper.run_state import read_run_state, update_run_state
+from mobility_scraper.update_checks import check_tomtom_update, get_apple_link
+from mobility_scraper.utils import convert_file_to_zip, write_df_to_csv_and_excel
+
+SOURCES = ("google", "apple", "waze", "tomtom")
+# reports which aren't written to CSV by build stages (names of DataFrames in results of build stages)
+UNWRITTEN_REPORTS = {"google": "google_world"}
+
+
+def write_report(df, paths, partitions_path, partitioned=False):
+    """Write the report as monolithic CSV and Excel reports or as a dataset partitioned by months.
+    Only changed partitions are rewritten, so daily updates of the partitioned dataset write only new data
+
+    Args:
+        df (DataFrame): report which needs to be written
+        paths (dict): locations of CSV and Excel reports by extensions
+        partitions_path: directory of the partitioned dataset
+        partitioned (bool): write the partitioned dataset instead of CSV and Excel reports
+    """
+    if partitioned:
+        from mobility_scraper.storage import write_partitioned
+
+        # CSV report isn't rewritten, so readers switch to partitions (see storage.partitions_are_current)
+        write_partitioned(df, partitions_path, csv_path=paths[".csv"])
+    else:
+        write_df_to_csv_and_excel(df, paths)
+
+
+def validate_built_report(source, report, accept_changes=False):
+    """Validate the built report before publishing and print a summary of changes compared to the previous output
+
+    Args:
+        source (str): name of the report (google, apple, waze, tomtom or summary)
+        report (DataFrame): built report
+        accept_changes (bool): publish the report even if dates, partitions or rows were removed
+                               compared to the previous output
+
+    Returns:
+        dict: partition hashes of the report (they are stored in the run state after publishing)
+
+    Raises:
+        ValueError: if the report fails validation (the previous output is kept)
+    """
+    from mobility_scraper.validation import diff_summary, validate_report
+
+    schema = REPORT_SCHEMAS[source]
+    state = read_run_state().get(source, {})
+    result = validate_report(
+        report,
+        schema.keys,
+        schema.metrics,
+        state.get("partitions"),
+        state.get("last_date"),
+        accept_changes=accept_changes,
+    )
+    for warning in result.warnings:
+        print(source, ": Warning:", warning)
+    print(source, ":", diff_summary(result.diff))
+    if result.errors:
+        raise ValueError(
+            (
+                "{} report failed validation: {}. If changes compared to the previous "
+                "output are expected, run with --accept-changes"
+            ).format(source, "; ".join(result.errors))
+        )
+    return result.partitions
 
-@exception_handler("Google")
-def process_google_data():
-    """Process Google mobility data
+
+def download_google_data(upstream=None):
+    """Download Google mobility data
+
+    Args:
+        upstream (dict, optional): results of upstream stages (not used)
 
     Returns:
         bool: flag indicating whether or not new files have been downloaded
@@ -30,162 +110,295 @@ def process_google_data():
     # download new report
     new_files_status_google = download_files(GOOGLE_DIR, GOOGLE_URL, GOOGLE_RAW_FILE)
     print(update_status_message("Google", new_files_status_google))
-    # build new reports
-    if new_files_status_google:
-        # build basic report for the worldwide
-        google_world = google_mobility.build_report(GOOGLE_CSV_PATH)
-        # build a report for the US
-        google_US = google_mobility.build_report(GOOGLE_CSV_PATH, "US")
-        # build a report for Brazil
-        google_brazil = google_mobility.build_report(
-            GOOGLE_CSV_PATH, report_type="regions_detailed", countries=["Brazil"]
+    if not new_files_status_google:
+        # delete raw CSV report
+        GOOGLE_CSV_PATH.unlink()
+    return new_files_status_google
+
+
+def build_google_reports(upstream=None, partitioned=False, accept_changes=False):
+    """Build Google reports from the downloaded raw report
+
+    Args:
+        upstream (dict, optional): results of upstream stages (not used)
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        accept_changes (bool): publish reports even if data was removed compared to the previous output
+
+    Returns:
+        dict: built reports which are used by merging ("google_world" and "google_US")
+    """
+    from mobility_scraper.frame_cache import write_frame_cache
+    from mobility_scraper.mobility_processing import google_mobility
+
+    # build basic report for the worldwide
+    google_world = google_mobility.build_report(GOOGLE_CSV_PATH)
+    partitions = validate_built_report("google", google_world, accept_changes)
+    # build a report for the US
+    google_US = google_mobility.build_report(GOOGLE_CSV_PATH, "US")
+    # build a report for Brazil
+    google_brazil = google_mobility.build_report(
+        GOOGLE_CSV_PATH, report_type="regions_detailed", countries=["Brazil"]
+    )
+    # build detailed reports for world regions
+    google_world_regions = google_mobility.build_report(
+        GOOGLE_CSV_PATH,
+        report_type="world_regions_detailed",
+        country_regions_file=COUNTRY_WORLD_REGIONS_PATH,
+    )
+    google_europe = google_world_regions[
+        google_world_regions.world_region.isin(["Europe"])
+    ]
+    google_asia_africa = google_world_regions[
+        google_world_regions.world_region.isin(["Asia", "Africa"])
+    ]
+    google_america_oceania = google_world_regions[
+        google_world_regions.world_region.isin(
+            ["South America", "North America", "Oceania"]
         )
-        # build detailed reports for world regions
-        google_world_regions = google_mobility.build_report(
-            GOOGLE_CSV_PATH,
-            report_type="world_regions_detailed",
-            country_regions_file=COUNTRY_WORLD_REGIONS_PATH,
+    ]
+    # write reports to CSV and Excel
+#     write_df_to_csv_and_excel(google_world, GOOGLE_REGIONS_PATHS)
+#     write_df_to_csv_and_excel(google_US, GOOGLE_US_PATHS)
+#     write_df_to_csv_and_excel(google_brazil, GOOGLE_BRAZIL_PATHS)
+#     write_df_to_csv_and_excel(google_asia_africa, GOOGLE_ASIA_AFRICA_PATHS)
+    # write_df_to_csv_and_excel(google_america_oceania, GOOGLE_AMERICA_OCEANIA_PATHS) # temporary disable
+    # write Europe data
+    # write_df_to_csv_and_excel(google_europe, GOOGLE_EUROPE_PATHS)
+    # convert csv to zip
+#     convert_file_to_zip(
+#         GOOGLE_EUROPE_ZIP_PATH,
+#         GOOGLE_EUROPE_PATHS[".csv"],
+#         GOOGLE_EUROPE_FILE + ".csv",
+#     )
+#     GOOGLE_EUROPE_PATHS[".csv"].unlink()
+    if partitioned:
+        from mobility_scraper.storage import write_partitioned
+
+        write_partitioned(
+            google_world,
+            GOOGLE_REGIONS_PARTITIONS_PATH,
+            csv_path=GOOGLE_REGIONS_PATHS[".csv"],
         )
-        google_europe = google_world_regions[
-            google_world_regions.world_region.isin(["Europe"])
-        ]
-        google_asia_africa = google_world_regions[
-            google_world_regions.world_region.isin(["Asia", "Africa"])
-        ]
-        google_america_oceania = google_world_regions[
-            google_world_regions.world_region.isin(
-                ["South America", "North America", "Oceania"]
-            )
-        ]
-        # write reports to CSV and Excel
-#         write_df_to_csv_and_excel(google_world, GOOGLE_REGIONS_PATHS)
-#         write_df_to_csv_and_excel(google_US, GOOGLE_US_PATHS)
-#         write_df_to_csv_and_excel(google_brazil, GOOGLE_BRAZIL_PATHS)
-#         write_df_to_csv_and_excel(google_asia_africa, GOOGLE_ASIA_AFRICA_PATHS)
-        # write_df_to_csv_and_excel(google_america_oceania, GOOGLE_AMERICA_OCEANIA_PATHS) # temporary disable
-        # write Europe data
-        # write_df_to_csv_and_excel(google_europe, GOOGLE_EUROPE_PATHS)
-        # convert csv to zip
-#         convert_file_to_zip(
-#             GOOGLE_EUROPE_ZIP_PATH,
-#             GOOGLE_EUROPE_PATHS[".csv"],
-#             GOOGLE_EUROPE_FILE + ".csv",
-#         )
-#         GOOGLE_EUROPE_PATHS[".csv"].unlink()
-        # zip raw report
-        convert_file_to_zip(GOOGLE_ZIP_PATH, GOOGLE_CSV_PATH, GOOGLE_RAW_FILE)
+    # cache reports for merging
+    write_frame_cache(google_world, GOOGLE_REGIONS_CACHE_PATH)
+    write_frame_cache(google_US, GOOGLE_US_CACHE_PATH)
+    # zip raw report
+    convert_file_to_zip(GOOGLE_ZIP_PATH, GOOGLE_CSV_PATH, GOOGLE_RAW_FILE)
+    update_run_state(
+        "google", last_date=str(google_world["date"].max()), partitions=partitions
+    )
     # delete raw CSV report
     GOOGLE_CSV_PATH.unlink()
-    return new_files_status_google
+    return {"google_world": google_world, "google_US": google_US}
+
 
+def download_apple_data(upstream=None):
+    """Download Apple mobility data
 
-@exception_handler("Apple")
-def process_apple_data():
-    """Process Apple mobility data
+    Args:
+        upstream (dict, optional): results of upstream stages (not used)
 
     Returns:
         bool: flag indicating whether or not new files have been downloaded
     """
     new_files_status_apple = download_files(
-        APPLE_DIR, apple_mobility.get_link(), APPLE_RAW_FILE
+        APPLE_DIR, get_apple_link(), APPLE_RAW_FILE
     )
     print(update_status_message("Apple", new_files_status_apple))
-    if new_files_status_apple:
-        # build reports
-        apple_world = apple_mobility.build_report(APPLE_CSV_PATH)
-        apple_US = apple_mobility.build_report(APPLE_CSV_PATH, report_type="US")
-        # write reports to CSV and Excel
-        write_df_to_csv_and_excel(apple_world, APPLE_WORLD_PATHS)
-#         write_df_to_csv_and_excel(apple_US, APPLE_US_PATHS)
-
     return new_files_status_apple
 
 
-@exception_handler("Waze")
-def process_waze_data():
-    """Process Waze mobility data
+def build_apple_reports(upstream=None, partitioned=False, accept_changes=False):
+    """Build Apple reports from the downloaded raw report
+
+    Args:
+        upstream (dict, optional): results of upstream stages (not used)
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        accept_changes (bool): publish reports even if data was removed compared to the previous output
+
+    Returns:
+        dict: built reports which are used by merging ("apple_world" and "apple_US")
+    """
+    from mobility_scraper.frame_cache import write_frame_cache
+    from mobility_scraper.mobility_processing import apple_mobility
+
+    # build reports
+    apple_world = apple_mobility.build_report(APPLE_CSV_PATH)
+    apple_US = apple_mobility.build_report(APPLE_CSV_PATH, report_type="US")
+    partitions = validate_built_report("apple", apple_world, accept_changes)
+    # write reports to CSV and Excel
+    write_report(
+        apple_world, APPLE_WORLD_PATHS, APPLE_WORLD_PARTITIONS_PATH, partitioned
+    )
+#     write_df_to_csv_and_excel(apple_US, APPLE_US_PATHS)
+    # cache reports for merging
+    write_frame_cache(apple_world, APPLE_WORLD_CACHE_PATH)
+    write_frame_cache(apple_US, APPLE_US_CACHE_PATH)
+    update_run_state(
+        "apple", last_date=str(apple_world["date"].max()), partitions=partitions
+    )
+    return {"apple_world": apple_world, "apple_US": apple_US}
+
+
+def download_waze_data(upstream=None):
+    """Download Waze mobility data
+
+    Args:
+        upstream (dict, optional): results of upstream stages (not used)
 
     Returns:
         bool: flag indicating whether or not new files have been downloaded
     """
     new_files_status_waze = download_files(WAZE_DIR, WAZE_URLS, WAZE_RAW_FILES)
     print(update_status_message("Waze", new_files_status_waze))
-    if new_files_status_waze:
-        # build report
-        waze = waze_mobility.build_report(WAZE_COUNTRY_LEVEL_PATH, WAZE_CITY_LEVEL_PATH)
-        # write report to CSV and Excel
-        write_df_to_csv_and_excel(waze, WAZE_REPORT_PATHS)
-
     return new_files_status_waze
 
 
-@exception_handler("TomTom")
-def process_tomtom_data():
-    """Process TomTom mobility data
+def build_waze_report(upstream=None, partitioned=False, accept_changes=False):
+    """Build Waze report from the downloaded raw reports
+
+    Args:
+        upstream (dict, optional): results of upstream stages (not used)
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        accept_changes (bool): publish the report even if data was removed compared to the previous output
 
     Returns:
-        bool: flag indicating whether or not new files have been downloaded
+        bool: flag indicating whether or not the report has been built
     """
-    # process TomTom reports
-    new_files_status_tomtom = tomtom_mobility.check_update(TOMTOM_REPORT_PATHS[".csv"])
-    print(update_status_message("TomTom", new_files_status_tomtom))
-    if new_files_status_tomtom:
-        # scrape new data
-        tomtom_new = tomtom_mobility.download_report(COUNTRY_ALPHA_CODES_PATH)
-        tomtom = tomtom_mobility.merge_with_historical_data(
-            tomtom_new, TOMTOM_HISTORICAL_DATA_PATH
-        )
-        write_df_to_csv_and_excel(tomtom, TOMTOM_REPORT_PATHS)
+    from mobility_scraper.mobility_processing import waze_mobility
+
+    # build report
+    waze = waze_mobility.build_report(WAZE_COUNTRY_LEVEL_PATH, WAZE_CITY_LEVEL_PATH)
+    partitions = validate_built_report("waze", waze, accept_changes)
+    # write report to CSV and Excel
+    write_report(waze, WAZE_REPORT_PATHS, WAZE_REPORT_PARTITIONS_PATH, partitioned)
+    update_run_state(
+        "waze",
+        last_date=waze["date"].max().strftime("%Y-%m-%d"),
+        partitions=partitions,
+    )
+    return True
+
+
+def check_tomtom_data(upstream=None, tomtom_sample=False):
+    """Check if new TomTom data available
 
+    Args:
+        upstream (dict, optional): results of upstream stages (not used)
+        tomtom_sample (bool): check updates for a sample of cities instead of a single city
+
+    Returns:
+        bool: flag indicating whether or not new data available
+    """
+    new_files_status_tomtom = check_tomtom_update(
+        TOMTOM_REPORT_PATHS[".csv"],
+        sample=TOMTOM_CHECK_SAMPLE if tomtom_sample else None,
+    )
+    print(update_status_message("TomTom", new_files_status_tomtom))
     return new_files_status_tomtom
 
 
-@click.group(help="Scraper for mobility data")
-def cli():
-    pass
+def build_tomtom_report(upstream=None, partitioned=False, accept_changes=False):
+    """Scrape new TomTom data and build the report
 
+    Args:
+        upstream (dict, optional): results of upstream stages (not used)
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        accept_changes (bool): publish the report even if data was removed compared to the previous output
 
-@cli.command(help="Scrape mobility data from specified sources")
-@click.argument("sources", nargs=-1)
-def scrape(sources):
-    """Scrape mobility data from specified sources
+    Returns:
+        bool: flag indicating whether or not the report has been built
+    """
+    from mobility_scraper.mobility_processing import tomtom_mobility
+
+    # scrape new data
+    tomtom_new = tomtom_mobility.download_report(COUNTRY_ALPHA_CODES_PATH)
+    tomtom = tomtom_mobility.merge_with_historical_data(
+        tomtom_new, TOMTOM_HISTORICAL_DATA_PATH
+    )
+    partitions = validate_built_report("tomtom", tomtom, accept_changes)
+    write_report(
+        tomtom, TOMTOM_REPORT_PATHS, TOMTOM_REPORT_PARTITIONS_PATH, partitioned
+    )
+    update_run_state(
+        "tomtom", last_date=str(tomtom["date"].max()), partitions=partitions
+    )
+    return True
+
+
+def select_report_source(frames, name, cache_path, csv_path, partitions_path=None):
+    """Select the cheapest source of the report: DataFrame built in the same process,
+    memory-mapped Arrow cache, the partitioned dataset (if it's newer than CSV) or CSV file
 
     Args:
-        sources (tuple, optional): Mobility data sources
+        frames (dict): reports built by upstream stages by names
+        name (str): name of the report in frames
+        cache_path: location of the Arrow cache of the report
+        csv_path: location of the report in CSV
+        partitions_path (optional): directory of the partitioned dataset of the report
 
     Returns:
-        dict: status of update for all sources (Google, Apple, Waze and TomTom)
+        DataFrame or path: source of the report
     """
-    all_sources = ("google", "apple", "waze", "tomtom")
-    new_files_status = {source: False for source in all_sources}
-    # if no parameters are provided, scrape data from all sources
-    if len(sources) == 0:
-        sources = all_sources
-    # process Google reports
-    new_files_status["google"] = process_google_data() if "google" in sources else False
-    # process Apple reports
-    new_files_status["apple"] = process_apple_data() if "apple" in sources else False
-    # process Waze reports
-    new_files_status["waze"] = process_waze_data() if "waze" in sources else False
-    # process TomTom reports
-    new_files_status["tomtom"] = process_tomtom_data() if "tomtom" in sources else False
-    return new_files_status
+    from mobility_scraper.frame_cache import read_frame_cache
 
+    if frames.get(name) is not None:
+        return frames[name]
+    cached = read_frame_cache(cache_path, csv_path)
+    if cached is not None:
+        return cached
+    if partitions_path is not None:
+        from mobility_scraper.storage import partitions_are_current, read_partitioned
 
-@cli.command("merge", help="Merge mobility reports (Apple and Google)")
-@exception_handler("Merging")
-def merge_data():
-    """Merge Google and Apple reports"""
+        if partitions_are_current(partitions_path, csv_path):
+            return read_partitioned(partitions_path)
+    return csv_path
+
+
+def merge_mobility_reports(upstream=None, partitioned=False, accept_changes=False):
+    """Merge Google and Apple reports
+
+    Args:
+        upstream (dict, optional): results of upstream stages. Reports built by Apple and Google stages
+                                   are used directly instead of reading them from files
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        accept_changes (bool): publish reports even if data was removed compared to the previous output
+
+    Returns:
+        bool: flag indicating whether or not merged reports have been built
+    """
+    from mobility_scraper.mobility_processing import merge_reports
+
+    frames = {}
+    for result in (upstream or {}).values():
+        if isinstance(result, dict):
+            frames.update(result)
     print("Merging reports...")
     summary_regions = merge_reports.build_summary_report(
-        APPLE_WORLD_PATHS[".csv"],
-        GOOGLE_REGIONS_PATHS[".csv"],
+        select_report_source(
+            frames,
+            "apple_world",
+            APPLE_WORLD_CACHE_PATH,
+            APPLE_WORLD_PATHS[".csv"],
+            APPLE_WORLD_PARTITIONS_PATH,
+        ),
+        select_report_source(
+            frames,
+            "google_world",
+            GOOGLE_REGIONS_CACHE_PATH,
+            GOOGLE_REGIONS_PATHS[".csv"],
+            GOOGLE_REGIONS_PARTITIONS_PATH,
+        ),
         COUNTRY_APPLE_TO_GOOGLE_PATH,
         SUBREGIONS_APPLE_TO_GOOGLE_PATH,
     )
     summary_US = merge_reports.build_summary_report(
-        APPLE_US_PATHS[".csv"],
-        GOOGLE_US_PATHS[".csv"],
+        select_report_source(
+            frames, "apple_US", APPLE_US_CACHE_PATH, APPLE_US_PATHS[".csv"]
+        ),
+        select_report_source(
+            frames, "google_US", GOOGLE_US_CACHE_PATH, GOOGLE_US_PATHS[".csv"]
+        ),
         COUNTRY_APPLE_TO_GOOGLE_PATH,
         SUBREGIONS_APPLE_TO_GOOGLE_PATH,
         "US",
@@ -193,21 +406,488 @@ def merge_data():
     summary_countries = summary_regions[summary_regions["region"] == "Total"].drop(
         columns=["region"]
     )
+    partitions = validate_built_report("summary", summary_countries, accept_changes)
 
     print("Writing merged reports to files...")
     # write_df_to_csv_and_excel(summary_regions, SUMMARY_REGIONS_PATHS)
-    write_df_to_csv_and_excel(summary_countries, SUMMARY_COUNTRIES_PATHS)
+    write_report(
+        summary_countries,
+        SUMMARY_COUNTRIES_PATHS,
+        SUMMARY_COUNTRIES_PARTITIONS_PATH,
+        partitioned,
+    )
     # write_df_to_csv_and_excel(summary_US, SUMMARY_US_PATHS) # temporary disable
+    update_run_state(
+        "summary",
+        last_date=str(summary_countries["date"].max()),
+        partitions=partitions,
+    )
+    return True
+
+
+def build_mobility_panel(upstream=None):
+    """Build a panel of all sources (Google, Apple, Waze and TomTom) aligned by geography and date
+
+    Args:
+        upstream (dict, optional): results of upstream stages. Reports built by Apple and Google stages
+                                   are used directly instead of reading them from files
+
+    Returns:
+        bool: flag indicating whether or not the panel has been built
+    """
+    from mobility_scraper.mobility_processing import panel_builder
+    from mobility_scraper.storage import read_report
+
+    frames = {}
+    for result in (upstream or {}).values():
+        if isinstance(result, dict):
+            frames.update(result)
+    print("Building panel...")
+    panel = panel_builder.build_panel_from_reports(
+        select_report_source(
+            frames,
+            "google_world",
+            GOOGLE_REGIONS_CACHE_PATH,
+            GOOGLE_REGIONS_PATHS[".csv"],
+            GOOGLE_REGIONS_PARTITIONS_PATH,
+        ),
+        select_report_source(
+            frames,
+            "apple_world",
+            APPLE_WORLD_CACHE_PATH,
+            APPLE_WORLD_PATHS[".csv"],
+            APPLE_WORLD_PARTITIONS_PATH,
+        ),
+        read_report(WAZE_REPORT_PATHS[".csv"], WAZE_REPORT_PARTITIONS_PATH),
+        read_report(TOMTOM_REPORT_PATHS[".csv"], TOMTOM_REPORT_PARTITIONS_PATH),
+        COUNTRY_APPLE_TO_GOOGLE_PATH,
+        SUBREGIONS_APPLE_TO_GOOGLE_PATH,
+    )
+    print("Writing panel to files...")
+    SUMMARY_PANEL_PATH.parent.mkdir(exist_ok=True)
+    panel.save(SUMMARY_PANEL_PATH)
+    write_df_to_csv_and_excel(panel.to_frame(), SUMMARY_ALL_SOURCES_PATHS)
+    return True
+
+
+def update_report_analytics(
+    source, windows=(7,), baseline_weeks=5, full=False, report=None, min_periods=1
+):
+    """Update analytics (rolling means, weekday baselines and changes) of the report
+
+    Revised history is detected by comparing partition hashes of the report with hashes stored
+    when analytics were computed last time: analytics are recomputed from the earliest changed month.
+    If analytics settings have changed since the last time, all dates are recomputed.
+
+    Args:
+        source (str): name of the report (google, apple, waze, tomtom or summary)
+        windows (tuple): lengths of rolling windows in days
+        baseline_weeks (int): number of weeks in the weekday baseline
+        full (bool): recompute analytics for all dates
+        report (DataFrame, optional): the report. If None - it's read from CSV or the partitioned dataset
+        min_periods (int): minimum number of available values in a rolling window
+
+    Returns:
+        bool: flag indicating whether or not analytics have been updated
+    """
+    schema = REPORT_SCHEMAS[source]
+    if (
+        report is None
+        and not schema.csv_path.is_file()
+        and not (schema.partitions_path / MANIFEST_FILE).is_file()
+    ):
+        print(source, ": Report not found, analytics skipped.")
+        return False
+    import pandas as pd
+    from mobility_scraper.mobility_processing import analytics
+    from mobility_scraper.storage import partition_hashes, read_report
+
+    print(source, ": Updating analytics...")
+    if report is None:
+        report = read_report(schema.csv_path, schema.partitions_path)
+    report = report.loc[:, [*schema.keys, *schema.metrics]]
+    partitions = partition_hashes(report, schema.keys[-1])
+    settings = analytics.analytics_settings(windows, baseline_weeks, min_periods)
+    state = read_run_state().get(source, {})
+    previous_partitions = state.get("analytics_partitions")
+    previous = None
+    since = None
+    if (
+        not full
+        and previous_partitions is not None
+        and state.get("analytics_settings") == settings
+        and schema.analytics_path.is_file()
+    ):
+        previous = pd.read_csv(schema.analytics_path, low_memory=False)
+        since = analytics.revision_start(previous_partitions, partitions)
+    report_analytics = analytics.update_analytics(
+        report,
+        previous,
+        schema.keys,
+        schema.metrics,
+        windows=windows,
+        baseline_weeks=baseline_weeks,
+        min_periods=min_periods,
+        since=since,
+    )
+    report_analytics.to_csv(schema.analytics_path, index=False)
+    update_run_state(
+        source, analytics_partitions=partitions, analytics_settings=settings
+    )
+    return True
+
+
+def build_report_analytics(upstream=None, source=None):
+    """Update analytics of the report after its build stage. Reports which aren't written to CSV
+    by their build stages are taken from results of these stages
+
+    Args:
+        upstream (dict, optional): results of upstream stages
+        source (str): name of the report (google, apple, waze or tomtom)
+
+    Returns:
+        bool: flag indicating whether or not analytics have been updated
+    """
+    if source not in UNWRITTEN_REPORTS:
+        return update_report_analytics(source)
+    result = (upstream or {}).get(source + "_build")
+    if not isinstance(result, dict):
+        print(source, ": Report hasn't been built, analytics skipped.")
+        return False
+    return update_report_analytics(source, report=result[UNWRITTEN_REPORTS[source]])
+
+
+def build_stages(partitioned=False, tomtom_sample=False, accept_changes=False):
+    """Build stages of the pipeline: download (or check) and build stages for every source,
+    merging of Apple and Google reports, the panel of all sources and analytics of reports
+
+    Args:
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        tomtom_sample (bool): check TomTom updates for a sample of cities instead of a single city
+        accept_changes (bool): publish reports even if data was removed compared to the previous output
+
+    Returns:
+        list: stages of the pipeline
+    """
+
+    def report_files(source):
+        # reports are read from CSV or from the partitioned dataset
+        schema = REPORT_SCHEMAS[source]
+        return (schema.csv_path, schema.partitions_path / MANIFEST_FILE)
+
+    def report_output(source):
+        schema = REPORT_SCHEMAS[source]
+        if partitioned:
+            return (schema.partitions_path / MANIFEST_FILE,)
+        return (schema.csv_path,)
+
+    stages = [
+        Stage("google_download", download_google_data),
+        Stage(
+            "google_build",
+            partial(
+                build_google_reports,
+                partitioned=partitioned,
+                accept_changes=accept_changes,
+            ),
+            ("google_download",),
+            outputs=(GOOGLE_ZIP_PATH,),
+        ),
+        Stage("apple_download", download_apple_data),
+        Stage(
+            "apple_build",
+            partial(
+                build_apple_reports,
+                partitioned=partitioned,
+                accept_changes=accept_changes,
+            ),
+            ("apple_download",),
+            outputs=report_output("apple"),
+        ),
+        Stage("waze_download", download_waze_data),
+        Stage(
+            "waze_build",
+            partial(
+                build_waze_report,
+                partitioned=partitioned,
+                accept_changes=accept_changes,
+            ),
+            ("waze_download",),
+            outputs=report_output("waze"),
+        ),
+        Stage("tomtom_check", partial(check_tomtom_data, tomtom_sample=tomtom_sample)),
+        Stage(
+            "tomtom_build",
+            partial(
+                build_tomtom_report,
+                partitioned=partitioned,
+                accept_changes=accept_changes,
+            ),
+            ("tomtom_check",),
+            (TOMTOM_HISTORICAL_DATA_PATH, COUNTRY_ALPHA_CODES_PATH),
+            report_output("tomtom"),
+        ),
+        Stage(
+            "merge",
+            partial(
+                merge_mobility_reports,
+                partitioned=partitioned,
+                accept_changes=accept_changes,
+            ),
+            ("apple_build", "google_build"),
+            (
+                *report_files("apple"),
+                *report_files("google"),
+                COUNTRY_APPLE_TO_GOOGLE_PATH,
+                SUBREGIONS_APPLE_TO_GOOGLE_PATH,
+            ),
+            report_output("summary"),
+        ),
+        Stage(
+            "panel",
+            build_mobility_panel,
+            ("apple_build", "google_build", "waze_build", "tomtom_build"),
+            (
+                *report_files("apple"),
+                *report_files("waze"),
+                *report_files("tomtom"),
+                COUNTRY_APPLE_TO_GOOGLE_PATH,
+                SUBREGIONS_APPLE_TO_GOOGLE_PATH,
+            ),
+            (SUMMARY_PANEL_PATH, SUMMARY_ALL_SOURCES_PATHS[".csv"]),
+        ),
+    ]
+    for source in SOURCES:
+        stages.append(
+            Stage(
+                source + "_analytics",
+                partial(build_report_analytics, source=source),
+                (source + "_build",),
+                () if source in UNWRITTEN_REPORTS else report_files(source),
+                (REPORT_SCHEMAS[source].analytics_path,),
+            )
+        )
+    return stages
+
+
+def run_stages(
+    targets=None, partitioned=False, tomtom_sample=False, accept_changes=False
+):
+    """Run the pipeline and print statuses of stages
+
+    Args:
+        targets (iterable, optional): names of target stages. If None - all stages
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        tomtom_sample (bool): check TomTom updates for a sample of cities instead of a single city
+        accept_changes (bool): publish reports even if data was removed compared to the previous output
+
+    Returns:
+        dict: statuses of stages by names
+    """
+    statuses = run_pipeline(
+        build_stages(partitioned, tomtom_sample, accept_changes), targets
+    )
+    print(status_report(statuses))
+    return statuses
+
+
+def run_standalone(stages):
+    """Run stages one after another without checks of upstream stages and inputs, and print their statuses.
+    A failed stage doesn't stop other stages
+
+    Args:
+        stages (iterable): stages which need to be run (their upstream stages are ignored)
+
+    Returns:
+        dict: statuses of stages by names
+    """
+    statuses = {stage.name: run_stage(stage, {}) for stage in stages}
+    print(status_report(statuses))
+    return statuses
+
+
+def exit_on_failure(statuses):
+    """Exit with a non-zero code if any stage failed or was blocked, so schedulers can detect failures
+
+    Args:
+        statuses (dict): statuses of stages by names
+    """
+    if has_failures(statuses):
+        sys.exit(1)
+
+
+@click.group(help="Scraper for mobility data")
+def cli():
+    pass
+
+
+partitioned_option = click.option(
+    "--partitioned",
+    is_flag=True,
+    help="Write reports partitioned by year and month instead of CSV and Excel",
+)
+
+tomtom_sample_option = click.option(
+    "--tomtom-sample",
+    is_flag=True,
+    help="Check TomTom updates for a sample of cities (concurrently)",
+)
+
+accept_changes_option = click.option(
+    "--accept-changes",
+    is_flag=True,
+    help="Publish reports even if dates, months or rows were removed compared to the previous output",
+)
+
+
+@cli.command(help="Scrape mobility data from specified sources")
+@click.argument("sources", nargs=-1)
+@partitioned_option
+@tomtom_sample_option
+@accept_changes_option
+def scrape(sources, partitioned=False, tomtom_sample=False, accept_changes=False):
+    """Scrape mobility data from specified sources. Exits with code 1 if any stage failed or was blocked
+
+    Args:
+        sources (tuple, optional): Mobility data sources
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        tomtom_sample (bool): check TomTom updates for a sample of cities instead of a single city
+        accept_changes (bool): publish reports even if data was removed compared to the previous output
+    """
+    # if no parameters are provided, scrape data from all sources
+    if len(sources) == 0:
+        sources = SOURCES
+    targets = [source + "_build" for source in sources]
+    exit_on_failure(run_stages(targets, partitioned, tomtom_sample, accept_changes))
+
+
+@cli.command("merge", help="Merge mobility reports (Apple and Google)")
+@partitioned_option
+@accept_changes_option
+def merge_data(partitioned=False, accept_changes=False):
+    """Merge Google and Apple reports. Exits with code 1 if merging failed
+
+    Args:
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        accept_changes (bool): publish reports even if data was removed compared to the previous output
+    """
+    merge = partial(
+        merge_mobility_reports, partitioned=partitioned, accept_changes=accept_changes
+    )
+    exit_on_failure(run_standalone([Stage("merge", merge)]))
+
+
+@cli.command(
+    "panel", help="Build a panel of all sources (Google, Apple, Waze and TomTom)"
+)
+def build_panel():
+    """Align all reports on a shared (geography, day) grid and write the panel.
+    Exits with code 1 if building failed
+    """
+    exit_on_failure(run_standalone([Stage("panel", build_mobility_panel)]))
+
+
+@cli.command(
+    "analytics",
+    help="Compute rolling means, weekday baselines and changes for processed reports",
+)
+@click.argument("sources", nargs=-1)
+@click.option(
+    "--window",
+    "windows",
+    type=int,
+    multiple=True,
+    default=(7,),
+    show_default=True,
+    help="Length of rolling window in days",
+)
+@click.option(
+    "--baseline-weeks",
+    type=int,
+    default=5,
+    show_default=True,
+    help="Number of weeks in the weekday baseline",
+)
+@click.option("--full", is_flag=True, help="Recompute analytics for all dates")
+def build_analytics(sources, windows=(7,), baseline_weeks=5, full=False):
+    """Update analytics of processed reports. Exits with code 1 if analytics of any report failed
+
+    Args:
+        sources (tuple, optional): Mobility data sources. If not provided - Google, Apple, Waze and TomTom
+        windows (tuple): lengths of rolling windows in days
+        baseline_weeks (int): number of weeks in the weekday baseline
+        full (bool): recompute analytics for all dates
+    """
+    if len(sources) == 0:
+        sources = SOURCES
+    stages = [
+        Stage(
+            source + "_analytics",
+            lambda upstream, source=source: update_report_analytics(
+                source, windows, baseline_weeks, full
+            ),
+        )
+        for source in sources
+    ]
+    exit_on_failure(run_standalone(stages))
 
 
 @cli.command(help="Scrape data from all sources and merge reports")
-@click.pass_context
-def run_all(ctx):
-    """Run parse flow and build reports"""
-    new_files_status = ctx.invoke(scrape)
-    # build merged reports
-    if new_files_status["apple"] or new_files_status["google"]:
-        ctx.invoke(merge_data)
+@partitioned_option
+@tomtom_sample_option
+@accept_changes_option
+def run_all(partitioned=False, tomtom_sample=False, accept_changes=False):
+    """Run all stages of the pipeline. Stages whose upstream stages and inputs haven't changed are skipped,
+    independent stages run in parallel, a failed stage blocks only stages which depend on it.
+    Exits with code 1 if any stage failed or was blocked
+
+    Args:
+        partitioned (bool): write reports as datasets partitioned by months instead of CSV and Excel
+        tomtom_sample (bool): check TomTom updates for a sample of cities instead of a single city
+        accept_changes (bool): publish reports even if data was removed compared to the previous output
+    """
+    statuses = run_stages(
+        partitioned=partitioned,
+        tomtom_sample=tomtom_sample,
+        accept_changes=accept_changes,
+    )
+    exit_on_failure(statuses)
+
+
+@cli.command("query", help="Query processed mobility reports")
+@click.argument(
+    "source", type=click.Choice(["google", "apple", "waze", "tomtom", "summary"])
+)
+@click.option("--country", "countries", multiple=True, help="Country name")
+@click.option("--region", "regions", multiple=True, help="Subregion or city name")
+@click.option("--start", "start_date", help="First date (YYYY-MM-DD)")
+@click.option("--end", "end_date", help="Last date (YYYY-MM-DD)")
+@click.option("--metric", "metrics", multiple=True, help="Metric column")
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Output CSV file (stdout by default)",
+)
+def query_data(source, countries, regions, start_date, end_date, metrics, output):
+    """Query processed mobility reports and write results in CSV format
+
+    Args:
+        source (str): name of the report (google, apple, waze, tomtom or summary)
+        countries (tuple): country names
+        regions (tuple): names of subregions/cities
+        start_date (str): first date (inclusive)
+        end_date (str): last date (inclusive)
+        metrics (tuple): metric columns
+        output: output file
+    """
+    from mobility_scraper.query import iter_query, write_query_csv
+
+    chunks = iter_query(source, countries, regions, start_date, end_date, metrics)
+    try:
+        write_query_csv(chunks, output)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 
 if __name__ == "__main__":
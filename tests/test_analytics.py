@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobility_scraper.mobility_processing.analytics import (
+    compute_analytics,
+    revision_start,
+    update_analytics,
+)
+from mobility_scraper.storage import partition_hashes
+
+KEYS = ["country", "date"]
+METRICS = ["parks", "driving"]
+
+
+def make_report(days=120, seed=0, start_date="2021-01-01"):
+    """Build a random report with gaps in dates and missing values"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, periods=days, freq="D")
+    report = pd.DataFrame(
+        {
+            "country": np.repeat(["Brazil", "Japan", "Spain"], days),
+            "date": np.tile(dates, 3),
+            **{
+                metric: rng.integers(-80, 80, 3 * days).astype(float)
+                for metric in METRICS
+            },
+        }
+    )
+    report.loc[rng.random(len(report)) < 0.1, "parks"] = np.nan
+    # some days are missing
+    return report[rng.random(len(report)) > 0.05].reset_index(drop=True)
+
+
+def reference_analytics(report, window, baseline_weeks):
+    """Reference: pandas rolling windows over a daily calendar of every country"""
+    results = []
+    for country, rows in report.groupby("country"):
+        rows = rows.set_index("date")
+        calendar = pd.date_range(rows.index.min(), rows.index.max(), freq="D")
+        daily = rows.reindex(calendar)
+        result = pd.DataFrame({"country": country, "date": rows.index})
+        for metric in METRICS:
+            average = daily[metric].rolling(window, min_periods=1).mean()
+            # the change is defined only if there is a row 7 days earlier
+            has_row = daily["country"].notna()
+            lagged = average.shift(7).where(has_row.shift(7, fill_value=False))
+            lagged_weeks = pd.concat(
+                [
+                    daily[metric].shift(7 * week)
+                    for week in range(1, baseline_weeks + 1)
+                ],
+                axis=1,
+            )
+            baseline = lagged_weeks.mean(axis=1)
+            result[metric + "_{}d_avg".format(window)] = average[rows.index].to_numpy()
+            result[metric + "_wow"] = (average - lagged)[rows.index].to_numpy()
+            result[metric + "_weekday_baseline"] = baseline[rows.index].to_numpy()
+            result[metric + "_vs_baseline"] = (daily[metric] - baseline)[
+                rows.index
+            ].to_numpy()
+        results.append(result)
+    return pd.concat(results, ignore_index=True)
+
+
+@pytest.mark.parametrize("window, baseline_weeks", [(7, 5), (28, 2), (1, 1)])
+def test_compute_analytics_matches_pandas_rolling(window, baseline_weeks):
+    report = make_report()
+    analytics = compute_analytics(
+        report.sample(frac=1, random_state=0), KEYS, METRICS, (window,), baseline_weeks
+    )
+    expected = reference_analytics(report, window, baseline_weeks)
+    assert analytics[KEYS].equals(expected[KEYS])
+    for column in expected.columns.drop(KEYS):
+        np.testing.assert_allclose(
+            analytics[column].to_numpy(),
+            expected[column].to_numpy(),
+            atol=1e-6,
+            err_msg=column,
+        )
+
+
+def test_compute_analytics_with_several_windows():
+    report = make_report()
+    analytics = compute_analytics(report, KEYS, METRICS, (7, 28))
+    for window in (7, 28):
+        expected = reference_analytics(report, window, 5)
+        column = "driving_{}d_avg".format(window)
+        np.testing.assert_allclose(analytics[column], expected[column], atol=1e-6)
+    # week-over-week change uses the first window
+    np.testing.assert_allclose(
+        analytics["driving_wow"],
+        reference_analytics(report, 7, 5)["driving_wow"],
+        atol=1e-6,
+    )
+
+
+def test_update_analytics_with_new_days_matches_full_computation():
+    report = make_report(days=150)
+    old_report = report[report["date"] < "2021-05-01"]
+    previous = compute_analytics(old_report, KEYS, METRICS)
+    updated = update_analytics(report, previous, KEYS, METRICS)
+    pd.testing.assert_frame_equal(updated, compute_analytics(report, KEYS, METRICS))
+
+
+def test_update_analytics_recomputes_revised_history():
+    old_report = make_report(days=150)
+    previous = compute_analytics(old_report, KEYS, METRICS)
+    # a provider revised values of March and added new days
+    report = pd.concat(
+        [old_report, make_report(days=20, seed=1, start_date="2021-05-31")],
+        ignore_index=True,
+    )
+    revised = report["date"].between("2021-03-10", "2021-03-12")
+    report.loc[revised, "driving"] += 10
+    since = revision_start(
+        partition_hashes(old_report, "date"), partition_hashes(report, "date")
+    )
+    assert since == "2021-03-01"
+    updated = update_analytics(report, previous, KEYS, METRICS, since=since)
+    expected = compute_analytics(report, KEYS, METRICS)
+    pd.testing.assert_frame_equal(updated, expected)
+    # without the revision start old analytics are kept, but values come from the report
+    stale = update_analytics(report, previous, KEYS, METRICS)
+    pd.testing.assert_series_equal(stale["driving"], expected["driving"])
+    assert not stale["driving_7d_avg"].equals(expected["driving_7d_avg"])
+
+
+def test_revision_start():
+    partitions = {"2021-01": [10, "a"], "2021-02": [10, "b"]}
+    assert revision_start(partitions, dict(partitions)) is None
+    added = {**partitions, "2021-03": [5, "c"]}
+    assert revision_start(partitions, added) == "2021-03-01"
+    changed = {"2021-01": [10, "a"], "2021-02": [9, "x"]}
+    assert revision_start(partitions, changed) == "2021-02-01"
+    assert revision_start(partitions, {"2021-02": [10, "b"]}) == "2021-01-01"
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"baseline_weeks": 2},
+        {"min_periods": 3},
+        {"windows": (28, 7)},
+    ],
+)
+def test_changed_settings_recompute_all_dates(tmp_path, monkeypatch, settings):
+    import scraper
+    from mobility_scraper.report_schemas import REPORT_SCHEMAS
+
+    monkeypatch.chdir(tmp_path)
+    schema = REPORT_SCHEMAS["tomtom"]
+    schema.csv_path.parent.mkdir()
+    report = make_report(days=100).rename(
+        columns={"parks": "congestion", "driving": "diffRatio"}
+    )
+    report = report.assign(city="Total", date=report["date"].dt.strftime("%Y-%m-%d"))
+    report.iloc[:-30].to_csv(schema.csv_path, index=False)
+    scraper.update_report_analytics("tomtom", windows=(7, 28))
+    # new days with other settings
+    report.to_csv(schema.csv_path, index=False)
+    settings = {"windows": (7, 28), **settings}
+    scraper.update_report_analytics("tomtom", **settings)
+    analytics = pd.read_csv(schema.analytics_path)
+    expected = compute_analytics(
+        report.loc[:, list(schema.keys) + list(schema.metrics)],
+        schema.keys,
+        schema.metrics,
+        settings["windows"],
+        settings.get("baseline_weeks", 5),
+        settings.get("min_periods", 1),
+    )
+    expected["date"] = expected["date"].astype(str)
+    pd.testing.assert_frame_equal(analytics, expected, check_dtype=False)
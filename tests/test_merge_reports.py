@@ -0,0 +1,39 @@
+import pandas as pd
+
+from mobility_scraper import utils
+from mobility_scraper.mobility_processing.merge_reports import build_summary_report
+
+
+def test_summary_of_reports_written_by_years(tmp_path, monkeypatch):
+    google = pd.DataFrame(
+        {
+            "country": ["Japan"] * 3,
+            "region": ["Total"] * 3,
+            "date": ["2020-12-31", "2021-01-01", "2021-01-02"],
+            "parks": [1.0, 2.0, 3.0],
+        }
+    )
+    apple = pd.DataFrame(
+        {
+            "country": ["Japan"] * 3,
+            "sub-region": ["Total"] * 3,
+            "subregion_and_city": ["Total"] * 3,
+            "geo_type": ["country/region"] * 3,
+            "date": ["2020-12-31", "2021-01-01", "2021-01-02"],
+            "driving": [4.0, 5.0, 6.0],
+            "transit": [7.0, 8.0, 9.0],
+            "walking": [1.0, 1.0, 1.0],
+        }
+    )
+    # the report doesn't fit into an Excel sheet, so it's split by years
+    monkeypatch.setattr(utils, "EXCEL_MAX_ROWS", 2)
+    paths = {ext: tmp_path / ("apple" + ext) for ext in (".csv", ".xlsx")}
+    utils.write_df_to_csv_and_excel(apple, paths)
+    assert apple["date"].tolist() == google["date"].tolist()
+    assert paths[".xlsx"].is_file()
+
+    summary = build_summary_report(
+        apple, google, tmp_path / "missing.csv", tmp_path / "missing.csv"
+    )
+    assert len(summary) == 3
+    assert summary[["parks", "driving"]].notna().all().all()
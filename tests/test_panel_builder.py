@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobility_scraper.mobility_processing.panel_builder import (
+    MobilityPanel,
+    build_panel,
+    build_panel_from_reports,
+)
+
+
+@pytest.fixture
+def reports():
+    google = pd.DataFrame(
+        {
+            "country": ["Japan"] * 3,
+            "region": ["Total", "Tokyo", "Tokyo"],
+            "date": ["2021-01-01", "2021-01-01", "2021-01-03"],
+            "retail and recreation": [1.0, 2.0, 3.0],
+            "grocery and pharmacy": [1.0, 2.0, np.nan],
+            "parks": [1.0, 2.0, 3.0],
+            "transit stations": [1.0, 2.0, 3.0],
+            "workplaces": [1.0, 2.0, 3.0],
+            "residential": [1.0, 2.0, 3.0],
+        }
+    )
+    # the sub-region and the city have the same name
+    apple = pd.DataFrame(
+        {
+            "country": ["Japan"] * 3,
+            "sub-region": ["Total", "Tokyo", "Tokyo"],
+            "subregion_and_city": ["Total", "Tokyo", "Tokyo"],
+            "geo_type": ["country/region", "sub-region", "city"],
+            "date": ["2021-01-02"] * 3,
+            "driving": [10.0, 20.0, 30.0],
+            "transit": [10.0, 20.0, 30.0],
+            "walking": [10.0, 20.0, 30.0],
+        }
+    )
+    waze = pd.DataFrame(
+        {
+            "country": ["Japan"],
+            "city": ["Tokyo"],
+            "geo_type": ["city"],
+            "date": ["2021-01-02"],
+            "driving_waze": [-5.0],
+        }
+    )
+    tomtom = pd.DataFrame(
+        {
+            "country": ["Japan"],
+            "city": ["Tokyo"],
+            "date": ["2021-01-01"],
+            "congestion": [30.0],
+            "diffRatio": [-0.1],
+        }
+    )
+    return google, apple, waze, tomtom
+
+
+@pytest.fixture
+def panel(reports, tmp_path):
+    missing = tmp_path / "missing.csv"
+    return build_panel_from_reports(*reports, missing, missing)
+
+
+def test_geographies_are_distinguished_by_geo_types(panel):
+    assert panel.geographies.values.tolist() == [
+        ["Japan", "Tokyo", "city"],
+        ["Japan", "Tokyo", "sub-region"],
+        ["Japan", "Total", "country"],
+    ]
+    assert panel.values.shape == (3, 3, 12)
+    driving = panel.metrics.index("driving")
+    np.testing.assert_array_equal(panel.values[:, 1, driving], [30.0, 20.0, 10.0])
+    # Waze and TomTom cities are aligned with Apple cities
+    city = panel.slice(geo_types=["city"], start_date="2021-01-02")
+    assert city.values[0, 0, city.metrics.index("driving_waze")] == -5.0
+
+
+def test_duplicate_cells_are_rejected(reports):
+    waze = reports[2].rename(columns={"city": "region"})
+    with pytest.raises(ValueError, match="several values of driving_waze"):
+        build_panel([pd.concat([waze, waze])])
+    # the same metric in another report
+    with pytest.raises(ValueError, match="several values of driving_waze"):
+        build_panel([waze, waze.copy()])
+    # missing values don't conflict
+    build_panel([waze, waze.assign(driving_waze=np.nan)])
+
+
+def test_missing_geography_keys_are_rejected(reports):
+    waze = reports[2].rename(columns={"city": "region"}).assign(region=np.nan)
+    with pytest.raises(ValueError, match="missing country, region or geo type"):
+        build_panel([waze])
+
+
+def test_slice(panel):
+    part = panel.slice(
+        countries=["Japan"],
+        regions=["Tokyo"],
+        start_date="2021-01-02",
+        end_date="2021-01-05",
+        metrics=["parks", "driving"],
+    )
+    assert part.start_date == pd.Timestamp("2021-01-02")
+    assert part.metrics == ("parks", "driving")
+    assert part.values.shape == (2, 2, 2)
+    assert part.geographies["geo_type"].tolist() == ["city", "sub-region"]
+    np.testing.assert_array_equal(part.values[1, 1], [3.0, np.nan])
+    assert panel.slice(start_date="2022-01-01").values.shape[1] == 0
+    # the date window is selected without copying data
+    window = panel.slice(start_date="2021-01-02")
+    assert np.shares_memory(window.values, panel.values)
+
+
+def test_save_and_load(panel, tmp_path):
+    path = tmp_path / "panel.npz"
+    panel.save(path)
+    loaded = MobilityPanel.load(path)
+    pd.testing.assert_frame_equal(loaded.geographies, panel.geographies)
+    assert loaded.start_date == panel.start_date
+    assert loaded.metrics == panel.metrics
+    np.testing.assert_array_equal(loaded.values, panel.values)
+    np.testing.assert_array_equal(loaded.mask, panel.mask)
+    pd.testing.assert_frame_equal(loaded.to_frame(), panel.to_frame())
+    frame = loaded.to_frame()
+    assert not frame.duplicated(["country", "region", "geo_type", "date"]).any()
+    assert len(frame) == 7
@@ -0,0 +1,175 @@
+import os
+
+import pytest
+
+from mobility_scraper.pipeline import (
+    BLOCKED,
+    FAILED,
+    NO_CHANGES,
+    SKIPPED,
+    SUCCESS,
+    Stage,
+    run_pipeline,
+)
+
+
+class Sources:
+    """Stages download -> build -> publish, which record their calls
+
+    download reports new data if has_new_data is set, build fails if fail_build is set
+    """
+
+    def __init__(self, directory):
+        self.input_path = directory / "input.csv"
+        self.output_path = directory / "output.csv"
+        self.published_path = directory / "published.csv"
+        self.run_state_path = directory / "run_state.json"
+        self.input_path.write_text("country,date\n")
+        self.has_new_data = True
+        self.fail_build = False
+        self.calls = []
+
+    def download(self, upstream):
+        self.calls.append("download")
+        return self.has_new_data
+
+    def build(self, upstream):
+        self.calls.append("build")
+        if self.fail_build:
+            raise ValueError("broken raw data")
+        self.output_path.write_text(self.input_path.read_text())
+        return True
+
+    def publish(self, upstream):
+        self.calls.append("publish")
+        self.published_path.write_text(self.output_path.read_text())
+        return True
+
+    def stages(self):
+        return [
+            Stage("download", self.download),
+            Stage(
+                "build",
+                self.build,
+                ("download",),
+                (self.input_path,),
+                (self.output_path,),
+            ),
+            Stage("publish", self.publish, ("build",), (), (self.published_path,)),
+        ]
+
+    def run(self):
+        self.calls = []
+        statuses = run_pipeline(
+            self.stages(), max_workers=2, run_state_path=self.run_state_path
+        )
+        return {name: status.status for name, status in statuses.items()}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return Sources(tmp_path)
+
+
+def test_stages_without_changes_are_skipped(sources):
+    assert sources.run() == {"download": SUCCESS, "build": SUCCESS, "publish": SUCCESS}
+    sources.has_new_data = False
+    assert sources.run() == {
+        "download": NO_CHANGES,
+        "build": SKIPPED,
+        "publish": SKIPPED,
+    }
+    assert sources.calls == ["download"]
+
+
+def test_new_data_reruns_downstream_stages(sources):
+    sources.run()
+    assert sources.run() == {"download": SUCCESS, "build": SUCCESS, "publish": SUCCESS}
+    assert sources.calls == ["download", "build", "publish"]
+
+
+def test_failed_stage_blocks_downstream_stages_and_is_retried(sources):
+    sources.fail_build = True
+    statuses = sources.run()
+    assert statuses == {"download": SUCCESS, "build": FAILED, "publish": BLOCKED}
+    # the provider has nothing new, but the failed and the blocked stages are retried
+    sources.has_new_data = False
+    sources.fail_build = False
+    assert sources.run() == {
+        "download": NO_CHANGES,
+        "build": SUCCESS,
+        "publish": SUCCESS,
+    }
+    # after the successful run they are skipped again
+    assert sources.run() == {
+        "download": NO_CHANGES,
+        "build": SKIPPED,
+        "publish": SKIPPED,
+    }
+
+
+def test_failed_stage_with_existing_outputs_is_retried(sources):
+    sources.run()
+    sources.fail_build = True
+    assert sources.run()["build"] == FAILED
+    sources.has_new_data = False
+    sources.fail_build = False
+    # outputs of the previous successful run exist, but new data wasn't built
+    assert sources.run()["build"] == SUCCESS
+
+
+def test_changed_input_content_reruns_the_stage(sources):
+    sources.run()
+    sources.has_new_data = False
+    sources.input_path.write_text("country,date\nJapan,2021-01-01\n")
+    assert sources.run() == {
+        "download": NO_CHANGES,
+        "build": SUCCESS,
+        "publish": SUCCESS,
+    }
+    assert sources.published_path.read_text() == sources.input_path.read_text()
+
+
+def test_modification_time_of_inputs_is_ignored(sources):
+    sources.run()
+    sources.has_new_data = False
+    # e.g. a fresh checkout of the repository
+    stat = sources.input_path.stat()
+    os.utime(sources.input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 10))
+    assert sources.run()["build"] == SKIPPED
+
+
+def test_missing_output_reruns_the_stage(sources):
+    sources.run()
+    sources.has_new_data = False
+    sources.output_path.unlink()
+    assert sources.run()["build"] == SUCCESS
+    assert sources.output_path.is_file()
+
+
+def test_target_stage_runs_with_upstream_stages_only(sources):
+    statuses = run_pipeline(
+        sources.stages(), ["build"], run_state_path=sources.run_state_path
+    )
+    assert list(statuses) == ["download", "build"]
+    with pytest.raises(ValueError):
+        run_pipeline(sources.stages(), ["merge"], run_state_path=sources.run_state_path)
+
+
+def test_commands_exit_with_error_if_stages_fail(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    import scraper
+
+    monkeypatch.chdir(tmp_path)
+    sources = Sources(tmp_path)
+    monkeypatch.setattr(scraper, "build_stages", lambda *args: sources.stages())
+    runner = CliRunner()
+    assert runner.invoke(scraper.cli, ["run-all"]).exit_code == 0
+    sources.fail_build = True
+    result = runner.invoke(scraper.cli, ["run-all"])
+    assert result.exit_code == 1
+    assert "build: failed" in result.output
+    assert "publish: blocked" in result.output
+    # standalone commands report failures too (there are no reports to merge)
+    assert runner.invoke(scraper.cli, ["merge"]).exit_code == 1
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from mobility_scraper.paths_and_URLs import (
+    WAZE_REPORT_PARTITIONS_PATH,
+    WAZE_REPORT_PATHS,
+)
+from mobility_scraper.query import query_report
+from mobility_scraper.storage import write_partitioned
+
+
+@pytest.fixture
+def waze_report(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    WAZE_REPORT_PATHS[".csv"].parent.mkdir()
+    dates = pd.date_range("2021-01-25", "2021-02-05", freq="D").strftime("%Y-%m-%d")
+    return pd.DataFrame(
+        {
+            "country": ["Japan"] * len(dates),
+            "city": ["Total"] * len(dates),
+            "geo_type": ["country"] * len(dates),
+            "date": dates,
+            "driving_waze": range(len(dates)),
+        }
+    )
+
+
+def test_query_reads_csv_report(waze_report):
+    waze_report.to_csv(WAZE_REPORT_PATHS[".csv"], index=False)
+    result = query_report("waze", countries=["Japan"], start_date="2021-02-01")
+    assert result["date"].tolist() == waze_report["date"].tolist()[-5:]
+
+
+def test_query_reads_current_partitions(waze_report):
+    # the CSV report is older than partitions
+    waze_report.iloc[:3].to_csv(WAZE_REPORT_PATHS[".csv"], index=False)
+    write_partitioned(
+        waze_report, WAZE_REPORT_PARTITIONS_PATH, csv_path=WAZE_REPORT_PATHS[".csv"]
+    )
+    result = query_report("waze", start_date="2021-02-04", metrics=["driving_waze"])
+    assert result["date"].tolist() == ["2021-02-04", "2021-02-05"]
+    assert list(result.columns) == [
+        "country",
+        "city",
+        "geo_type",
+        "date",
+        "driving_waze",
+    ]
+
+
+def test_query_falls_back_to_newer_csv_report(waze_report):
+    waze_report.to_csv(WAZE_REPORT_PATHS[".csv"], index=False)
+    write_partitioned(
+        waze_report, WAZE_REPORT_PARTITIONS_PATH, csv_path=WAZE_REPORT_PATHS[".csv"]
+    )
+    # a run without partitions appends a day to the CSV report
+    new_day = waze_report.iloc[[-1]].assign(date="2021-02-06")
+    pd.concat([waze_report, new_day]).to_csv(WAZE_REPORT_PATHS[".csv"], index=False)
+    result = query_report("waze", start_date="2021-02-05")
+    assert result["date"].tolist() == ["2021-02-05", "2021-02-06"]
+
+
+def test_query_validates_arguments(waze_report):
+    with pytest.raises(ValueError):
+        query_report("unknown")
+    with pytest.raises(ValueError):
+        query_report("waze", metrics=["parks"])
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobility_scraper.sorting import is_sorted_by, merge_sorted_runs, sort_by_keys
+
+KEYS = ["country", "city", "date"]
+
+
+def make_run(rng, rows, missing_cities=False):
+    """Build a random report sorted by KEYS"""
+    run = pd.DataFrame(
+        {
+            "country": rng.choice(["Japan", "Brazil", "Germany"], rows),
+            "city": rng.choice(["A", "B", "C", "Total"], rows),
+            "date": pd.to_datetime("2021-01-01")
+            + pd.to_timedelta(rng.integers(0, 30, rows), unit="D"),
+            "value": rng.normal(size=rows),
+        }
+    )
+    if missing_cities:
+        run.loc[rng.random(rows) < 0.2, "city"] = np.nan
+    return run.sort_values(KEYS, kind="mergesort").reset_index(drop=True)
+
+
+def stable_sort(frames):
+    """Reference: stable sort of concatenated runs"""
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.sort_values(KEYS, kind="mergesort").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("missing_cities", [False, True])
+def test_merge_sorted_runs_matches_stable_sort(seed, missing_cities):
+    rng = np.random.default_rng(seed)
+    frames = [make_run(rng, rows, missing_cities) for rows in (50, 1, 200, 0, 30)]
+    merged = merge_sorted_runs(frames, KEYS)
+    pd.testing.assert_frame_equal(merged, stable_sort(frames))
+
+
+def test_merge_sorted_runs_keeps_order_of_equal_keys():
+    first = pd.DataFrame({"country": ["Japan"], "city": ["A"], "date": ["2021-01-02"]})
+    second = pd.DataFrame(
+        {"country": ["Brazil", "Japan"], "city": ["A", "A"], "date": ["2021-01-01"] * 2}
+    )
+    first["run"], second["run"] = 0, 1
+    duplicate = first.assign(run=2)
+    merged = merge_sorted_runs([first, second, duplicate], KEYS)
+    assert merged["country"].tolist() == ["Brazil", "Japan", "Japan", "Japan"]
+    assert merged["run"].tolist() == [1, 1, 0, 2]
+
+
+def test_merge_sorted_runs_appends_non_overlapping_runs():
+    rng = np.random.default_rng(0)
+    history = sort_by_keys(make_run(rng, 100).assign(country="Brazil"), KEYS)
+    new_data = sort_by_keys(make_run(rng, 100).assign(country="Japan"), KEYS)
+    merged = merge_sorted_runs([history, new_data], KEYS)
+    pd.testing.assert_frame_equal(
+        merged, pd.concat([history, new_data], ignore_index=True)
+    )
+
+
+def test_merge_sorted_runs_of_empty_runs():
+    empty = pd.DataFrame(columns=KEYS)
+    assert len(merge_sorted_runs([empty, empty], KEYS)) == 0
+    assert len(merge_sorted_runs([], KEYS)) == 0
+
+
+def test_sort_by_keys():
+    rng = np.random.default_rng(1)
+    report = pd.concat([make_run(rng, 40), make_run(rng, 40)], ignore_index=True)
+    assert not is_sorted_by(report, KEYS)
+    sorted_report = sort_by_keys(report, KEYS)
+    assert is_sorted_by(sorted_report, KEYS)
+    pd.testing.assert_frame_equal(sorted_report, stable_sort([report]))
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from mobility_scraper.storage import (
+    partitions_are_current,
+    read_manifest,
+    read_partitioned,
+    read_report,
+    select_partitions,
+    write_partitioned,
+)
+
+
+@pytest.fixture
+def report():
+    dates = pd.date_range("2021-01-15", "2021-04-10", freq="D").strftime("%Y-%m-%d")
+    return pd.DataFrame(
+        {
+            "country": ["Japan"] * len(dates) + ["Spain"] * len(dates),
+            "date": list(dates) * 2,
+            "driving_waze": range(2 * len(dates)),
+        }
+    )
+
+
+def test_write_and_read_partitioned(tmp_path, report):
+    written = write_partitioned(report, tmp_path)
+    assert written == ["2021-01", "2021-02", "2021-03", "2021-04"]
+    assert (tmp_path / "2021" / "2021-02.csv").is_file()
+    manifest = read_manifest(tmp_path)
+    assert manifest["partitions"]["2021-01"]["min_date"] == "2021-01-15"
+    assert manifest["partitions"]["2021-04"]["max_date"] == "2021-04-10"
+    assert sum(p["rows"] for p in manifest["partitions"].values()) == len(report)
+    data = read_partitioned(tmp_path)
+    data = data.sort_values(["country", "date"], ignore_index=True)
+    pd.testing.assert_frame_equal(data, report)
+
+
+def test_only_changed_partitions_are_rewritten(tmp_path, report):
+    write_partitioned(report, tmp_path)
+    assert write_partitioned(report, tmp_path) == []
+    revised = report.copy()
+    revised.loc[revised["date"] == "2021-02-10", "driving_waze"] = -1
+    assert write_partitioned(revised, tmp_path) == ["2021-02"]
+    # a deleted file is written again even if its hash hasn't changed
+    (tmp_path / "2021" / "2021-03.csv").unlink()
+    assert write_partitioned(revised, tmp_path) == ["2021-03"]
+
+
+def test_removed_partitions_are_deleted(tmp_path, report):
+    write_partitioned(report, tmp_path)
+    write_partitioned(report[report["date"] >= "2021-02-01"], tmp_path)
+    assert not (tmp_path / "2021" / "2021-01.csv").exists()
+    assert "2021-01" not in read_manifest(tmp_path)["partitions"]
+    assert read_partitioned(tmp_path)["date"].min() == "2021-02-01"
+
+
+def test_partitions_outside_date_range_are_pruned(tmp_path, report):
+    write_partitioned(report, tmp_path)
+    manifest = read_manifest(tmp_path)
+    assert select_partitions(manifest) == ["2021-01", "2021-02", "2021-03", "2021-04"]
+    assert select_partitions(manifest, "2021-02-28", "2021-03-01") == [
+        "2021-02",
+        "2021-03",
+    ]
+    assert select_partitions(manifest, start_date="2021-04-11") == []
+    assert select_partitions(manifest, end_date="2021-01-14") == []
+    data = read_partitioned(tmp_path, "2021-02-27", "2021-03-02", ["driving_waze"])
+    assert list(data.columns) == ["driving_waze"]
+    assert len(data) == 2 * 4
+
+
+def test_partitions_are_stale_after_csv_rewrite(tmp_path, report):
+    csv_path = tmp_path / "report.csv"
+    partitions_path = tmp_path / "partitions"
+    report.to_csv(csv_path, index=False)
+    write_partitioned(report, partitions_path, csv_path=csv_path)
+    assert partitions_are_current(partitions_path, csv_path)
+    # the CSV report isn't rewritten, partitions are updated
+    new_day = pd.DataFrame(
+        {"country": ["Spain"], "date": ["2021-04-11"], "driving_waze": [1]}
+    )
+    updated = pd.concat([report, new_day], ignore_index=True)
+    write_partitioned(updated, partitions_path, csv_path=csv_path)
+    assert partitions_are_current(partitions_path, csv_path)
+    assert read_report(csv_path, partitions_path)["date"].max() == "2021-04-11"
+    # the CSV report is rewritten without partitions
+    newer = pd.concat(
+        [updated, new_day.assign(date="2021-04-12")], ignore_index=True
+    )
+    newer.to_csv(csv_path, index=False)
+    assert not partitions_are_current(partitions_path, csv_path)
+    assert read_report(csv_path, partitions_path)["date"].max() == "2021-04-12"
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobility_scraper.report_schemas import REPORT_SCHEMAS
+from mobility_scraper.storage import partition_hashes
+from mobility_scraper.validation import (
+    METRIC_RANGES,
+    diff_partitions,
+    diff_summary,
+    validate_report,
+)
+
+KEYS = ["country", "city", "date"]
+METRICS = ["congestion", "diffRatio"]
+
+
+@pytest.fixture
+def report():
+    dates = pd.date_range("2021-01-01", "2021-03-31", freq="D").strftime("%Y-%m-%d")
+    cities = ["Berlin", "Tokyo"]
+    return pd.DataFrame(
+        {
+            "country": np.repeat(["Germany", "Japan"], len(dates)),
+            "city": np.repeat(cities, len(dates)),
+            "date": list(dates) * 2,
+            "congestion": np.arange(2 * len(dates)) % 50,
+            "diffRatio": np.linspace(-0.5, 0.2, 2 * len(dates)),
+        }
+    )
+
+
+def validate(report, previous=None, **kwargs):
+    previous_partitions = None if previous is None else partition_hashes(previous)
+    previous_last_date = None if previous is None else previous["date"].max()
+    return validate_report(
+        report, KEYS, METRICS, previous_partitions, previous_last_date, **kwargs
+    )
+
+
+def test_all_metrics_have_ranges():
+    for schema in REPORT_SCHEMAS.values():
+        assert set(schema.metrics) <= set(METRIC_RANGES)
+
+
+def test_valid_report(report):
+    result = validate(report, report.iloc[:-10])
+    assert result.errors == []
+    assert result.warnings == []
+    assert sorted(result.partitions) == ["2021-01", "2021-02", "2021-03"]
+    assert result.diff["changed"] == ["2021-03"]
+    assert result.diff["rows"] == 10
+
+
+def test_schema_problems(report):
+    assert validate(report.iloc[:0]).errors == ["report is empty"]
+    errors = validate(report.drop(columns=["diffRatio"])).errors
+    assert errors == ["missing columns: diffRatio"]
+    errors = validate(report.assign(congestion="high")).errors
+    assert errors == ["column congestion isn't numeric"]
+    errors = validate(report.assign(date="not a date")).errors
+    assert errors == ["{} rows with missing or invalid dates".format(len(report))]
+
+
+def test_duplicate_keys(report):
+    duplicated = pd.concat([report, report.iloc[[5]]], ignore_index=True)
+    result = validate(duplicated, report, accept_changes=True)
+    assert result.errors == ["1 rows with duplicated keys (e.g. Germany, Berlin, 2021-01-06)"]
+
+
+def test_values_out_of_ranges(report):
+    report.loc[3, "congestion"] = -1
+    report.loc[4, "diffRatio"] = np.inf
+    errors = validate(report).errors
+    assert "1 values of congestion are below 0 (min: -1.0)" in errors
+    assert "1 infinite values in diffRatio" in errors
+
+
+def test_gaps_in_dates_are_warnings(report):
+    result = validate(report.drop(index=range(10, 15)))
+    assert result.errors == []
+    assert result.warnings == [
+        "1 entities have gaps in dates longer than 1 days "
+        "(the longest: 6 days before 2021-01-16 for Germany, Berlin)"
+    ]
+
+
+def test_truncated_report(report):
+    # e.g. a download which was cut off
+    truncated = report.iloc[: len(report) // 2 + 40]
+    errors = validate(truncated, report).errors
+    assert errors == ["50 of 180 rows were removed"]
+
+
+def test_removed_partitions(report):
+    errors = validate(report[report["date"] >= "2021-02-01"], report).errors
+    assert errors[0] == "partitions were removed: 2021-01"
+    assert "62 of 180 rows were removed" in errors
+
+
+def test_last_date_earlier_than_previous(report):
+    errors = validate(report[report["date"] < "2021-03-30"], report).errors
+    assert errors == [
+        "the last date 2021-03-29 is earlier than the previous one 2021-03-31",
+        "4 of 180 rows were removed",
+    ]
+
+
+def test_small_row_drop_is_allowed(report):
+    revised = report.drop(index=[100])
+    assert validate(revised, report, max_gap_days=2).errors == []
+    assert validate(revised, report, max_row_drop=0).errors == [
+        "1 of 180 rows were removed"
+    ]
+
+
+def test_accepted_changes_are_warnings(report):
+    # a provider legitimately dropped a city and the last days
+    changed = report[(report["city"] == "Tokyo") & (report["date"] < "2021-03-30")]
+    result = validate(changed, report, accept_changes=True)
+    assert result.errors == []
+    assert result.warnings == [
+        "the last date 2021-03-29 is earlier than the previous one 2021-03-31",
+        "92 of 180 rows were removed",
+    ]
+    # problems of the report itself are still errors
+    invalid = changed.assign(congestion=-5)
+    assert validate(invalid, report, accept_changes=True).errors
+
+
+def test_diff_partitions():
+    previous = {"2021-01": [10, "a"], "2021-02": [10, "b"], "2021-03": [5, "c"]}
+    current = {"2021-02": [10, "b"], "2021-03": [8, "x"], "2021-04": [2, "d"]}
+    diff = diff_partitions(previous, current)
+    assert diff == {
+        "added": ["2021-04"],
+        "removed": ["2021-01"],
+        "changed": ["2021-03"],
+        "unchanged": ["2021-02"],
+        "rows": -5,
+    }
+    assert diff_summary(diff) == (
+        "partitions: 1 added (2021-04), 1 removed (2021-01), 1 changed (2021-03), "
+        "1 unchanged, rows -5"
+    )
+    assert diff_partitions(None, current)["added"] == sorted(current)